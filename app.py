@@ -1,48 +1,28 @@
 # finance_app.py
 import streamlit as st
 import pandas as pd
-import numpy as np
-from datetime import datetime, date as dt_date, date
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from streamlit.logger import get_logger
+from datetime import datetime, date as dt_date
 import io
-import base64
-from PIL import Image
 import sqlite3
-import hashlib
-import json
-import re
-import tempfile
-import csv
 import os
-import time
-
-# Funções para formatar data no formato brasileiro
-def format_date_to_br(date_obj):
-    """Converte objeto date para string no formato dd/mm/aaaa"""
-    if isinstance(date_obj, dt_date):
-        return date_obj.strftime("%d/%m/%Y")
-    return date_obj
-
-def format_date_to_db(date_str):
-    """Converte string no formato dd/mm/aaaa para aaaa-mm-dd (formato do banco)"""
-    try:
-        if isinstance(date_str, str) and len(date_str) == 10 and date_str[2] == '/':
-            parts = date_str.split('/')
-            if len(parts) == 3:
-                return f"{parts[2]}-{parts[1]}-{parts[0]}"
-        return date_str
-    except:
-        return date_str
-
-def parse_date_input(date_input):
-    """Converte input de data para formato do banco"""
-    if isinstance(date_input, dt_date):
-        return date_input.strftime("%Y-%m-%d")
-    elif isinstance(date_input, str):
-        return format_date_to_db(date_input)
-    return date_input
+from finance.batch import build_reports_zip
+from finance.cashflow import get_cash_flow_cached
+from finance.charts import get_report_figures_cached
+from finance.bootstrap import initialize
+from finance.dates import format_brazilian_date, parse_date_input
+from finance.documents import clean_document, format_cnpj, format_cpf, validate_cnpj, validate_cpf
+from finance.exporter import (available_analysis_formats, export_for_analysis,
+                              export_to_html_with_logo, export_user_to_excel, format_dates_br)
+from finance.jobs import JOB_ACTIVE_STATUSES, get_import_jobs, get_user_import_jobs
+from finance.money import from_cents, to_cents
+from finance.summary import get_category_totals_cached, get_summary_totals, rebuild_summary
+from finance.transactions import (add_expense, add_income, delete_expense, delete_expenses, delete_income,
+                                  delete_incomes, frame_rows, get_expenses_df, get_expenses_page, get_incomes_df,
+                                  get_incomes_page, get_recent_expenses_df, get_recent_incomes_df, get_totals_cached,
+                                  restore_expenses, restore_incomes)
+from finance.users import (add_user, clear_user_data, delete_user, delete_user_completely,
+                           get_all_users, get_user_info, login_user, make_hashes, update_user_info)
 
 # Configuração da página
 st.set_page_config(
@@ -52,865 +32,25 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Função para rerun (compatibilidade com versões do Streamlit)
-def rerun():
-    # Apenas recarrega a página via JavaScript
-    st.markdown("""
-        <script>
-            window.location.reload(true);
-        </script>
-    """, unsafe_allow_html=True)
-
-# Funções de validação de CPF/CNPJ
-def validate_cpf(cpf):
-    """Valida CPF"""
-    cpf = re.sub(r'[^0-9]', '', cpf)
-    
-    if len(cpf) != 11:
-        return False
-    
-    if cpf == cpf[0] * 11:
-        return False
-    
-    # Cálculo do primeiro dígito verificador
-    sum = 0
-    for i in range(9):
-        sum += int(cpf[i]) * (10 - i)
-    remainder = sum % 11
-    digit1 = 0 if remainder < 2 else 11 - remainder
-    
-    # Cálculo do segundo dígito verificador
-    sum = 0
-    for i in range(10):
-        sum += int(cpf[i]) * (11 - i)
-    remainder = sum % 11
-    digit2 = 0 if remainder < 2 else 11 - remainder
-    
-    return int(cpf[9]) == digit1 and int(cpf[10]) == digit2
-
-def validate_cnpj(cnpj):
-    """Valida CNPJ"""
-    cnpj = re.sub(r'[^0-9]', '', cnpj)
-    
-    if len(cnpj) != 14:
-        return False
-    
-    if cnpj == cnpj[0] * 14:
-        return False
-    
-    # Cálculo do primeiro dígito verificador
-    weights1 = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-    sum1 = 0
-    for i in range(12):
-        sum1 += int(cnpj[i]) * weights1[i]
-    digit1 = 11 - (sum1 % 11)
-    if digit1 >= 10:
-        digit1 = 0
-    
-    # Cálculo do segundo dígito verificador
-    weights2 = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
-    sum2 = 0
-    for i in range(13):
-        sum2 += int(cnpj[i]) * weights2[i]
-    digit2 = 11 - (sum2 % 11)
-    if digit2 >= 10:
-        digit2 = 0
-    
-    return int(cnpj[12]) == digit1 and int(cnpj[13]) == digit2
-
-def format_cpf(cpf):
-    """Formata CPF"""
-    cpf = re.sub(r'[^0-9]', '', cpf)
-    if len(cpf) == 11:
-        return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
-    return cpf
-
-def format_cnpj(cnpj):
-    """Formata CNPJ"""
-    cnpj = re.sub(r'[^0-9]', '', cnpj)
-    if len(cnpj) == 14:
-        return f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
-    return cnpj
-
-# Funções de autenticação
-def make_hashes(password):
-    return hashlib.sha256(str.encode(password)).hexdigest()
-
-def check_hashes(password, hashed_text):
-    if make_hashes(password) == hashed_text:
-        return hashed_text
-    return False
-
-def create_user():
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    
-    try:
-        # Verificar se usuário admin já existe
-        c.execute('SELECT * FROM userstable WHERE username = "admin"')
-        if not c.fetchone():
-            # Criar usuário admin padrão se não existir
-            c.execute('INSERT INTO userstable(username, password, nome_completo, data_cadastro) VALUES (?, ?, ?, ?)', 
-                     ('admin', make_hashes('1234'), 'Administrador', datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-            conn.commit()
-    except Exception as e:
-        # Se houver erro, as tabelas serão criadas na próxima execução
-        print(f"Erro ao criar usuário admin: {e}")
-    finally:
-        conn.close()
-
-def add_user(username, password, nome_completo, cpf_cnpj, tipo_pessoa):
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    c.execute('INSERT INTO userstable(username, password, nome_completo, cpf_cnpj, tipo_pessoa, data_cadastro) VALUES (?,?,?,?,?,?)', 
-              (username, password, nome_completo, cpf_cnpj, tipo_pessoa, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-    conn.commit()
-    conn.close()
-
-def login_user(username, password):
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM userstable WHERE username =? AND password = ?', (username, password))
-    data = c.fetchall()
-    conn.close()
-    return data
-
-def get_user_info(username):
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    try:
-        c.execute('SELECT nome_completo, cpf_cnpj, tipo_pessoa FROM userstable WHERE username = ?', (username,))
-        data = c.fetchone()
-        conn.close()
-        return data
-    except sqlite3.OperationalError as e:
-        # Se a tabela não existir, retorna None
-        conn.close()
-        return None
-
-def update_user_info(username, nome_completo, cpf_cnpj, tipo_pessoa):
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    c.execute('UPDATE userstable SET nome_completo = ?, cpf_cnpj = ?, tipo_pessoa = ? WHERE username = ?', 
-              (nome_completo, cpf_cnpj, tipo_pessoa, username))
-    conn.commit()
-    conn.close()
-
-def get_all_users():
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    
-    # Verificar se as colunas existem na tabela
-    try:
-        c.execute('PRAGMA table_info(userstable)')
-        columns = [column[1] for column in c.fetchall()]
-        
-        # Construir a query baseada nas colunas existentes
-        if 'cpf_cnpj' in columns and 'tipo_pessoa' in columns:
-            c.execute('SELECT username, nome_completo, cpf_cnpj, tipo_pessoa FROM userstable')
-        elif 'nome_completo' in columns:
-            c.execute('SELECT username, nome_completo FROM userstable')
-        else:
-            c.execute('SELECT username FROM userstable')
-            
-        users = c.fetchall()
-    except sqlite3.OperationalError:
-        users = []
-    
-    conn.close()
-    return users
-
-def delete_user(username):
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM userstable WHERE username = ?', (username,))
-    conn.commit()
-    conn.close()
-
-def create_tables():
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    
-    # Tabela de usuários (se não existir)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS userstable (
-            username TEXT PRIMARY KEY, 
-            password TEXT,
-            nome_completo TEXT,
-            cpf_cnpj TEXT,
-            tipo_pessoa TEXT,
-            data_cadastro TEXT
-        )
-    ''')
-    
-    # Tabela de despesas - CORRIGIDA (adicionando colunas cpf_cnpj e tipo_pessoa)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS expenses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT,
-            origin TEXT,
-            value REAL,
-            category TEXT,
-            user_id TEXT,
-            cpf_cnpj TEXT,
-            tipo_pessoa TEXT
-        )
-    ''')
-    
-    # Tabela de receitas - CORRIGIDA (adicionando colunas cpf_cnpj e tipo_pessoa)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS incomes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT,
-            type TEXT,
-            description TEXT,
-            value REAL,
-            user_id TEXT,
-            cpf_cnpj TEXT,
-            tipo_pessoa TEXT
-        )
-    ''')
-    
-    conn.commit()
-    conn.close()
-
-# Função para verificar e atualizar a estrutura das tabelas se necessário
-def check_and_update_tables():
-    """Verifica e atualiza a estrutura das tabelas se necessário"""
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    
-    try:
-        # Verificar se a coluna cpf_cnpj existe na tabela expenses
-        c.execute("PRAGMA table_info(expenses)")
-        columns = [column[1] for column in c.fetchall()]
-        
-        if 'cpf_cnpj' not in columns:
-            # Adicionar colunas faltantes
-            c.execute("ALTER TABLE expenses ADD COLUMN cpf_cnpj TEXT")
-            c.execute("ALTER TABLE expenses ADD COLUMN tipo_pessoa TEXT")
-            st.info("Estrutura da tabela expenses atualizada com sucesso!")
-        
-        # Verificar se a coluna cpf_cnpj existe na tabela incomes
-        c.execute("PRAGMA table_info(incomes)")
-        columns = [column[1] for column in c.fetchall()]
-        
-        if 'cpf_cnpj' not in columns:
-            # Adicionar colunas faltantes
-            c.execute("ALTER TABLE incomes ADD COLUMN cpf_cnpj TEXT")
-            c.execute("ALTER TABLE incomes ADD COLUMN tipo_pessoa TEXT")
-            st.info("Estrutura da tabela incomes atualizada com sucesso!")
-            
-    except Exception as e:
-        st.error(f"Erro ao verificar/atualizar tabelas: {str(e)}")
-    finally:
-        conn.commit()
-        conn.close()
-
-# Inicializar tabelas
-create_user()
-create_tables()
-
-# Funções para gerenciar dados
-def add_expense(date, origin, value, category, user_id, cpf_cnpj=None, tipo_pessoa=None):
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    c.execute('INSERT INTO expenses(date, origin, value, category, user_id, cpf_cnpj, tipo_pessoa) VALUES (?,?,?,?,?,?,?)', 
-              (date, origin, value, category, user_id, cpf_cnpj, tipo_pessoa))
-    conn.commit()
-    conn.close()
-
-def get_expenses(user_id):
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM expenses WHERE user_id = ?', (user_id,))
-    data = c.fetchall()
-    conn.close()
-    return data
-
-def delete_expense(id, user_id):
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM expenses WHERE id = ? AND user_id = ?', (id, user_id))
-    conn.commit()
-    conn.close()
-
-def add_income(date, type, description, value, user_id, cpf_cnpj=None, tipo_pessoa=None):
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    c.execute('INSERT INTO incomes(date, type, description, value, user_id, cpf_cnpj, tipo_pessoa) VALUES (?,?,?,?,?,?,?)', 
-              (date, type, description, value, user_id, cpf_cnpj, tipo_pessoa))
-    conn.commit()
-    conn.close()
-
-def get_incomes(user_id):
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM incomes WHERE user_id = ?', (user_id,))
-    data = c.fetchall()
-    conn.close()
-    return data
-
-def delete_income(id, user_id):
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM incomes WHERE id = ? AND user_id = ?', (id, user_id))
-    conn.commit()
-    conn.close()
-
-# Função para buscar CPF/CNPJ cadastrados
-def get_all_cpf_cnpj():
-    """Retorna todos os CPF/CNPJ cadastrados no sistema com nomes"""
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    
-    all_data = {}
-    
-    try:
-        # Buscar CPF/CNPJ de usuários
-        c.execute('SELECT cpf_cnpj, nome_completo FROM userstable WHERE cpf_cnpj IS NOT NULL AND cpf_cnpj != ""')
-        users_data = c.fetchall()
-        
-        for cpf_cnpj, nome in users_data:
-            if cpf_cnpj:
-                all_data[cpf_cnpj] = nome
-    except:
-        pass
-    
-    try:
-        # Buscar CPF/CNPJ de despesas
-        c.execute('SELECT cpf_cnpj, origin FROM expenses WHERE cpf_cnpj IS NOT NULL AND cpf_cnpj != ""')
-        expenses_data = c.fetchall()
-        
-        for cpf_cnpj, origem in expenses_data:
-            if cpf_cnpj:
-                all_data[cpf_cnpj] = origem
-    except:
-        pass
-    
-    try:
-        # Buscar CPF/CNPJ de receitas
-        c.execute('SELECT cpf_cnpj, description FROM incomes WHERE cpf_cnpj IS NOT NULL AND cpf_cnpj != ""')
-        incomes_data = c.fetchall()
-        
-        for cpf_cnpj, descricao in incomes_data:
-            if cpf_cnpj:
-                all_data[cpf_cnpj] = descricao
-    except:
-        pass
-    
-    conn.close()
-    
-    # Combinar todos os dados
-    all_data = {}
-    for cpf_cnpj, nome in users_data:
-        if cpf_cnpj:
-            all_data[cpf_cnpj] = nome
-    
-    for cpf_cnpj, origem in expenses_data:
-        if cpf_cnpj:
-            all_data[cpf_cnpj] = origem
-    
-    for cpf_cnpj, descricao in incomes_data:
-        if cpf_cnpj:
-            all_data[cpf_cnpj] = descricao
-    
-    return all_data
-
-# Funções para manipulação da logo
-def get_base64_image(image_path):
-    """Converte imagem para base64 (para HTML)"""
-    try:
-        with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode()
-    except:
-        return ""
+# Logs do pacote finance (como os tempos da inicialização do banco) no console
+# do servidor, com o mesmo formato e nível dos logs do Streamlit
+get_logger("finance")
 
-def add_logo_to_excel(df, logo_path, output):
-    """Adiciona logo ao Excel usando xlsxwriter"""
-    try:
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name='Relatório Financeiro', index=False, startrow=3)
-            
-            workbook = writer.book
-            worksheet = writer.sheets['Relatório Financeiro']
-            
-            # Adicionar cabeçalho com logo
-            header_format = workbook.add_format({
-                'bold': True,
-                'font_size': 16,
-                'align': 'center',
-                'valign': 'vcenter'
-            })
-            
-            # Mesclar células para o título
-            worksheet.merge_range('A1:D1', 'RELATÓRIO FINANCEIRO - IGREJA BATISTA ÁGAPE', header_format)
-            worksheet.merge_range('A2:D2', 'Sistema de Gestão Financeira', workbook.add_format({'align': 'center'}))
-            
-            # Inserir logo se disponível
-            if os.path.exists(logo_path):
-                try:
-                    worksheet.insert_image('A1', logo_path, {'x_offset': 15, 'y_offset': 10, 'x_scale': 0.5, 'y_scale': 0.5})
-                except:
-                    st.warning("Não foi possível adicionar a logo ao Excel.")
-            
-            # Ajustar largura das colunas
-            worksheet.set_column('A:A', 15)
-            worksheet.set_column('B:B', 25)
-            worksheet.set_column('C:C', 15)
-            worksheet.set_column('D:D', 15)
-            
-        return True
-    except Exception as e:
-        st.error(f"Erro ao gerar Excel: {str(e)}")
-        return False
+# Inicializar o banco (uma única vez por processo; os reruns só reutilizam o resultado)
+initialize()
 
-# Função para exportar dados para Excel - CORRIGIDA
-def export_to_excel(expenses, incomes):
-    # Criar DataFrames com verificação de colunas
-    expense_data = []
-    for expense in expenses:
-        # Verificar se os índices existen antes de acessá-los
-        cpf_cnpj = expense[6] if len(expense) > 6 else None
-        tipo_pessoa = expense[7] if len(expense) > 7 else None
-        
-        expense_data.append({
-            'ID': expense[0],
-            'Data': expense[1],
-            'Origem': expense[2],
-            'Valor': expense[3],
-            'Categoria': expense[4],
-            'UserID': expense[5],
-            'CPF_CNPJ': cpf_cnpj,
-            'Tipo_Pessoa': tipo_pessoa
-        })
-    
-    expense_df = pd.DataFrame(expense_data) if expense_data else pd.DataFrame()
-    
-    income_data = []
-    for income in incomes:
-        # Verificar se os índices existen antes de acessá-los
-        cpf_cnpj = income[6] if len(income) > 6 else None
-        tipo_pessoa = income[7] if len(income) > 7 else None
-        
-        income_data.append({
-            'ID': income[0],
-            'Data': income[1],
-            'Tipo': income[2],
-            'Descrição': income[3],
-            'Valor': income[4],
-            'UserID': income[5],
-            'CPF_CNPJ': cpf_cnpj,
-            'Tipo_Pessoa': tipo_pessoa
-        })
-    
-    income_df = pd.DataFrame(income_data) if income_data else pd.DataFrame()
-    
-    # Formatar datas para o formato brasileiro
-    if not expense_df.empty:
-        expense_df['Data'] = pd.to_datetime(expense_df['Data']).dt.strftime("%d/%m/%Y")
-    if not income_df.empty:
-        income_df['Data'] = pd.to_datetime(income_df['Data']).dt.strftime("%d/%m/%Y")
-    
-    # Criar arquivo Excel em memória
-    output = io.BytesIO()
-    
-    try:
-        # Tentar usar xlsxwriter primeiro
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            if not expense_df.empty:
-                expense_df.to_excel(writer, sheet_name='Despesas', index=False)
-            if not income_df.empty:
-                income_df.to_excel(writer, sheet_name='Receitas', index=False)
-            
-            # Adicionar resumo
-            total_expenses = expense_df['Valor'].sum() if not expense_df.empty else 0
-            total_income = income_df['Valor'].sum() if not income_df.empty else 0
-            balance = total_income - total_expenses
-            
-            summary_data = {
-                'Metrica': ['Total de Despesas', 'Total de Receitas', 'Saldo'],
-                'Valor': [total_expenses, total_income, balance]
-            }
-            summary_df = pd.DataFrame(summary_data)
-            summary_df.to_excel(writer, sheet_name='Resumo', index=False)
-    except ImportError:
-        # Se xlsxwriter não estiver disponível, tentar openpyxl
-        try:
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                if not expense_df.empty:
-                    expense_df.to_excel(writer, sheet_name='Despesas', index=False)
-                if not income_df.empty:
-                    income_df.to_excel(writer, sheet_name='Receitas', index=False)
-                
-                # Adicionar resumo
-                total_expenses = expense_df['Valor'].sum() if not expense_df.empty else 0
-                total_income = income_df['Valor'].sum() if not income_df.empty else 0
-                balance = total_income - total_expenses
-                
-                summary_data = {
-                    'Metrica': ['Total de Despesas', 'Total de Receitas', 'Saldo'],
-                    'Valor': [total_expenses, total_income, balance]
-                }
-                summary_df = pd.DataFrame(summary_data)
-                summary_df.to_excel(writer, sheet_name='Resumo', index=False)
-        except ImportError:
-            # Se nenhum engine do Excel estiver disponível, usar CSV
-            st.warning("Bibliotecas Excel não disponíveis. Exportando como CSV.")
-            
-            # Combinar dados em um único DataFrame para CSV
-            combined_data = []
-            for expense in expenses:
-                # Verificar se os índices existen antes de acessá-los
-                cpf_cnpj = expense[6] if len(expense) > 6 else None
-                tipo_pessoa = expense[7] if len(expense) > 7 else None
-                
-                combined_data.append({
-                    'Tipo': 'Despesa',
-                    'Data': expense[1],
-                    'Descrição': expense[2],
-                    'Valor': -expense[3],
-                    'Categoria': expense[4],
-                    'CPF/CNPJ': cpf_cnpj,
-                    'Tipo Pessoa': tipo_pessoa
-                })
-            
-            for income in incomes:
-                # Verificar se os índices existen antes de acessá-los
-                cpf_cnpj = income[6] if len(income) > 6 else None
-                tipo_pessoa = income[7] if len(income) > 7 else None
-                
-                combined_data.append({
-                    'Tipo': 'Receita',
-                    'Data': income[1],
-                    'Descrição': income[3],
-                    'Valor': income[4],
-                    'Categoria': income[2],
-                    'CPF/CNPJ': cpf_cnpj,
-                    'Tipo Pessoa': tipo_pessoa
-                })
-            
-            if combined_data:
-                combined_df = pd.DataFrame(combined_data)
-                csv_output = combined_df.to_csv(index=False, sep=';')
-                output = io.BytesIO(csv_output.encode())
-            else:
-                output = io.BytesIO(b"Nenhum dado para exportar")
-    
-    output.seek(0)
-    return output
+# Avisos não bloqueantes: st.toast no lugar de st.success + time.sleep. Avisos
+# seguidos de st.rerun() ficam na sessão e aparecem no início da próxima execução
+def notify(message, icon="✅"):
+    st.session_state.setdefault('pending_toasts', []).append((message, icon))
 
-# Função para formatar data no formato brasileiro
-def format_brazilian_date(date_str):
-    try:
-        # Converter de YYYY-MM-DD para DD/MM/YYYY
-        if isinstance(date_str, str) and len(date_str) == 10 and date_str[4] == '-':
-            parts = date_str.split('-')
-            if len(parts) == 3:
-                return f"{parts[2]}/{parts[1]}/{parts[0]}"
-        # Se já estiver no formato brasileiro, retornar como está
-        elif isinstance(date_str, str) and len(date_str) == 10 and date_str[2] == '/':
-            return date_str
-        return date_str
-    except:
-        return date_str
-
-# Função para exportar relatório em HTML com logo - CORRIGIDA
-def export_to_html_with_logo(expenses, incomes, filters=None):
-    # Criar DataFrames com verificação de colunas
-    expense_data = []
-    for expense in expenses:
-        # Verificar se os índices existen antes de acessá-los
-        cpf_cnpj = expense[6] if len(expense) > 6 else None
-        tipo_pessoa = expense[7] if len(expense) > 7 else None
-        
-        expense_data.append({
-            'ID': expense[0],
-            'Data': expense[1],
-            'Origem': expense[2],
-            'Valor': expense[3],
-            'Categoria': expense[4],
-            'UserID': expense[5],
-            'CPF_CNPJ': cpf_cnpj,
-            'Tipo_Pessoa': tipo_pessoa
-        })
-    
-    expense_df = pd.DataFrame(expense_data) if expense_data else pd.DataFrame()
-    
-    income_data = []
-    for income in incomes:
-        # Verificar se os índices existen antes de acessá-los
-        cpf_cnpj = income[6] if len(income) > 6 else None
-        tipo_pessoa = income[7] if len(income) > 7 else None
-        
-        income_data.append({
-            'ID': income[0],
-            'Data': income[1],
-            'Tipo': income[2],
-            'Descrição': income[3],
-            'Valor': income[4],
-            'UserID': income[5],
-            'CPF_CNPJ': cpf_cnpj,
-            'Tipo_Pessoa': tipo_pessoa
-        })
-    
-    income_df = pd.DataFrame(income_data) if income_data else pd.DataFrame()
-    
-    # Formatar datas para o formato brasileiro
-    if not expense_df.empty:
-        expense_df['Data'] = pd.to_datetime(expense_df['Data']).dt.strftime("%d/%m/%Y")
-    if not income_df.empty:
-        income_df['Data'] = pd.to_datetime(income_df['Data']).dt.strftime("%d/%m/%Y")
-    
-    # Calcular totais
-    total_expenses = expense_df['Valor'].sum() if not expense_df.empty else 0
-    total_income = income_df['Valor'].sum() if not income_df.empty else 0
-    balance = total_income - total_expenses
-    
-    # Verificar se a logo existe e converter para base64
-    logo_base64 = ""
-    logo_path = "logo_igreja.png"
-    if os.path.exists(logo_path):
-        logo_base64 = get_base64_image(logo_path)
-    
-    # Criar conteúdo HTML para o relatório
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <title>Relatório Financeiro - Igreja Batista Ágape</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; margin: 40px; color: #333; }}
-            .header {{
-                display: flex;
-                align-items: center;
-                margin-bottom: 30px;
-                border-bottom: 2px solid #4CAF50;
-                padding-bottom: 20px;
-            }}
-            .logo {{
-                margin-right: 20px;
-            }}
-            .title {{
-                color: #2E7D32;
-            }}
-            table {{
-                border-collapse: collapse;
-                width: 100%;
-                margin-top: 20px;
-            }}
-            th, td {{
-                border: 1px solid #ddd;
-                padding: 12px;
-                text-align: left;
-            }}
-            th {{
-                background-color: #4CAF50;
-                color: white;
-            }}
-            tr:nth-child(even) {{
-                background-color: #f2f2f2;
-            }}
-            .summary {{
-                margin-top: 30px;
-                padding: 20px;
-                background-color: #E8F5E9;
-                border-radius: 5px;
-            }}
-            .footer {{
-                margin-top: 50px;
-                text-align: center;
-                font-size: 0.8em;
-                color: #777;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            {"<img class='logo' src='data:image/png;base64,{}' alt='Logo Igreja' width='100'>".format(logo_base64) if logo_base64 else ""}
-            <div>
-                <h1 class="title">Relatório Financeiro</h1>
-                <h2>Igreja Batista Ágape</h2>
-                <p>Usuário: {st.session_state.username}</p>
-                <p>Data do relatório: {datetime.now().strftime('%d/%m/%Y às %H:%M')}</p>
-            </div>
-        </div>
-        
-        <div class="summary">
-            <h3>Resumo Financeiro</h3>
-            <p><strong>Total de Receitas:</strong> R$ {total_income:,.2f}</p>
-            <p><strong>Total de Despesas:</strong> R$ {total_expenses:,.2f}</p>
-            <p><strong>Saldo:</strong> R$ {balance:,.2f}</p>
-        </div>
-    """
-    
-    # Adicionar despesas
-    if not expense_df.empty:
-        html_content += """
-        <h2>Despesas</h2>
-        <table>
-            <tr>
-                <th>Data</th>
-                <th>Origem</th>
-                <th>Categoria</th>
-                <th>CPF/CNPJ</th>
-                <th>Tipo Pessoa</th>
-                <th>Valor (R$)</th>
-            </tr>
-        """
-        for _, row in expense_df.iterrows():
-            cpf_cnpj_formatado = format_cpf(row['CPF_CNPJ']) if row['Tipo_Pessoa'] == "Física" else format_cnpj(row['CPF_CNPJ']) if row['CPF_CNPJ'] else "N/A"
-            html_content += f"""
-            <tr>
-                <td>{row['Data']}</td>
-                <td>{row['Origem']}</td>
-                <td>{row['Categoria']}</td>
-                <td>{cpf_cnpj_formatado}</td>
-                <td>{row['Tipo_Pessoa'] if pd.notna(row['Tipo_Pessoa']) else 'N/A'}</td>
-                <td>{row['Valor']:,.2f}</td>
-            </tr>
-            """
-        html_content += "</table>"
-    
-    # Adicionar receitas
-    if not income_df.empty:
-        html_content += """
-        <h2>Receitas</h2>
-        <table>
-            <tr>
-                <th>Data</th>
-                <th>Tipo</th>
-                <th>Descrição</th>
-                <th>CPF/CNPJ</th>
-                <th>Tipo Pessoa</th>
-                <th>Valor (R$)</th>
-            </tr>
-        """
-        for _, row in income_df.iterrows():
-            cpf_cnpj_formatado = format_cpf(row['CPF_CNPJ']) if row['Tipo_Pessoa'] == "Física" else format_cnpj(row['CPF_CNPJ']) if row['CPF_CNPJ'] else "N/A"
-            html_content += f"""
-            <tr>
-                <td>{row['Data']}</td>
-                <td>{row['Tipo']}</td>
-                <td>{row['Descrição']}</td>
-                <td>{cpf_cnpj_formatado}</td>
-                <td>{row['Tipo_Pessoa'] if pd.notna(row['Tipo_Pessoa']) else 'N/A'}</td>
-                <td>{row['Valor']:,.2f}</td>
-            </tr>
-            """
-        html_content += "</table>"
-    
-    html_content += """
-        <div class="footer">
-            Relatório gerado em """ + datetime.now().strftime('%d/%m/%Y %H:%M') + """ | Sistema de Controle Financeiro - Igreja Batista Ágape
-        </div>
-    </body>
-    </html>
-    """
-    
-    # Retornar o conteúdo HTML para download
-    return html_content
-
-# Função para importar dados de planilha
-def import_from_spreadsheet(file, user_id, is_income=False):
-    try:
-        # Ler a planilha
-        if file.name.endswith('.csv'):
-            df = pd.read_csv(file, sep=';')
-        else:
-            df = pd.read_excel(file)
-        
-        # Verificar colunas necessárias
-        required_columns = ['Data', 'Valor']
-        if is_income:
-            required_columns.extend(['Tipo', 'Descrição'])
-        else:
-            required_columns.extend(['Origem', 'Categoria'])
-        
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            return False, f"Colunas faltantes: {', '.join(missing_columns)}"
-        
-        # Processar cada linha
-        success_count = 0
-        error_count = 0
-        errors = []
-        
-        for _, row in df.iterrows():
-            try:
-                # Converter data
-                if isinstance(row['Data'], str):
-                    try:
-                        date_obj = datetime.strptime(row['Data'], "%d/%m/%Y")
-                    except:
-                        date_obj = datetime.strptime(row['Data'], "%Y-%m-%d")
-                else:
-                    date_obj = row['Data']
-                
-                db_date = date_obj.strftime("%Y-%m-%d")
-                
-                # Extrair CPF/CNPJ se disponível
-                cpf_cnpj = None
-                tipo_pessoa = None
-                
-                if 'CPF' in df.columns and pd.notna(row.get('CPF')):
-                    cpf_cnpj = re.sub(r'[^0-9]', '', str(row['CPF']))
-                    if len(cpf_cnpj) == 11:
-                        tipo_pessoa = 'Física'
-                    elif len(cpf_cnpj) == 14:
-                        tipo_pessoa = 'Jurídica'
-                
-                if 'CNPJ' in df.columns and pd.notna(row.get('CNPJ')):
-                    cpf_cnpj = re.sub(r'[^0-9]', '', str(row['CNPJ']))
-                    tipo_pessoa = 'Jurídica'
-                
-                if 'CPF_CNPJ' in df.columns and pd.notna(row.get('CPF_CNPJ')):
-                    cpf_cnpj = re.sub(r'[^0-9]', '', str(row['CPF_CNPJ']))
-                    if len(cpf_cnpj) == 11:
-                        tipo_pessoa = 'Física'
-                    elif len(cpf_cnpj) == 14:
-                        tipo_pessoa = 'Jurídica'
-                
-                # Inserir no banco de dados
-                if is_income:
-                    add_income(
-                        db_date,
-                        row['Tipo'],
-                        row['Descrição'],
-                        float(row['Valor']),
-                        user_id,
-                        cpf_cnpj,
-                        tipo_pessoa
-                    )
-                else:
-                    add_expense(
-                        db_date,
-                        row['Origem'],
-                        float(row['Valor']),
-                        row['Categoria'],
-                        user_id,
-                        cpf_cnpj,
-                        tipo_pessoa
-                    )
-                
-                success_count += 1
-                
-            except Exception as e:
-                error_count += 1
-                errors.append(f"Linha {_ + 2}: {str(e)}")
-        
-        return True, f"Importação concluída: {success_count} registros importados, {error_count} erros."
-    
-    except Exception as e:
-        return False, f"Erro ao processar planilha: {str(e)}"
+def show_pending_toasts():
+    for message, icon in st.session_state.pop('pending_toasts', []):
+        st.toast(message, icon=icon)
 
 # Interface principal da aplicação
 def main():
-    # Inicializar banco - CORREÇÃO DA ORDEM
-    #create_tables()  # Primeiro criar as tabelas
-    #check_and_update_tables()  # Verificar e atualizar estrutura
-    #create_user()    # Depois criar/verificar usuário admin
+    # O banco é preparado uma única vez por processo (initialize)
     
     # Inicializar estado da sessão
     if 'logged_in' not in st.session_state:
@@ -924,6 +64,8 @@ def main():
     if 'user_info' not in st.session_state:
         st.session_state.user_info = None
     
+    show_pending_toasts()
+    
     # Navegação principal baseada no estado de login
     if not st.session_state.logged_in:
         # Mostrar APENAS a página de login
@@ -971,8 +113,7 @@ def show_login_page():
                         st.session_state.username = username
                         st.session_state.user_info = get_user_info(username)
                         st.session_state.is_admin = (username == "admin")
-                        st.success(f"Bem-vindo(a), {username}!")
-                        time.sleep(1)
+                        notify(f"Bem-vindo(a), {username}!")
                         st.rerun()
                     else:
                         st.error("Usuário ou senha incorretos")
@@ -1019,16 +160,18 @@ def show_complete_registration_page():
             if nome_completo and cpf_cnpj:
                 if (tipo_pessoa == "Física" and validate_cpf(cpf_cnpj)) or (tipo_pessoa == "Jurídica" and validate_cnpj(cpf_cnpj)):
                     # Salvar informações no banco de dados
+                    cpf_cnpj = clean_document(cpf_cnpj)
                     update_user_info(st.session_state.username, nome_completo, cpf_cnpj, tipo_pessoa)
                     st.session_state.user_info = (nome_completo, cpf_cnpj, tipo_pessoa)
-                    st.success("Cadastro completado com sucesso!")
-                    time.sleep(1)
+                    notify("Cadastro completado com sucesso!")
                     st.rerun()
                 else:
                     st.error("Por favor, insira um CPF ou CNPJ válido.")
             else:
                 st.error("Por favor, preencha todos os campos obrigatórios.")
 
+# Formulários de lançamento: o envio reexecuta só o fragmento, não a barra lateral
+@st.fragment
 def show_expense_form():
     st.title("💸 Registrar Despesa")
     
@@ -1069,19 +212,19 @@ def show_expense_form():
                         add_expense(
                             db_date,
                             origin,
-                            value,
+                            to_cents(value),
                             category,
                             st.session_state.username
                         )
                     else:
-                        cpf_cnpj_clean = re.sub(r'[^0-9]', '', cpf_cnpj) if cpf_cnpj else None
+                        cpf_cnpj_clean = clean_document(cpf_cnpj)
                         
                         if (tipo_pessoa == "Física" and validate_cpf(cpf_cnpj_clean)) or \
                            (tipo_pessoa == "Jurídica" and validate_cnpj(cpf_cnpj_clean)):
                             add_expense(
                                 db_date,
                                 origin,
-                                value,
+                                to_cents(value),
                                 category,
                                 st.session_state.username,
                                 cpf_cnpj_clean,
@@ -1092,20 +235,19 @@ def show_expense_form():
                             add_expense(
                                 db_date,
                                 origin,
-                                value,
+                                to_cents(value),
                                 category,
                                 st.session_state.username
                             )
                     
-                    st.success("Despesa registrada com sucesso!")
-                    # REMOVER o time.sleep(1) e st.rerun() - isso causa múltiplas execuções
-                    # Em vez disso, usar st.experimental_rerun() apenas se necessário
+                    st.toast("Despesa registrada com sucesso!", icon="✅")
                     
                 except Exception as e:
                     st.error(f"Erro ao registrar despesa: {str(e)}")
             else:
                 st.error("Por favor, preencha todos os campos obrigatórios.")
 
+@st.fragment
 def show_income_form():
     st.title("💰 Registrar Receita")
     
@@ -1147,11 +289,11 @@ def show_income_form():
                             db_date,
                             type_income,
                             description,
-                            value,
+                            to_cents(value),
                             st.session_state.username
                         )
                     else:
-                        cpf_cnpj_clean = re.sub(r'[^0-9]', '', cpf_cnpj) if cpf_cnpj else None
+                        cpf_cnpj_clean = clean_document(cpf_cnpj)
                         
                         if (tipo_pessoa == "Física" and validate_cpf(cpf_cnpj_clean)) or \
                            (tipo_pessoa == "Jurídica" and validate_cnpj(cpf_cnpj_clean)):
@@ -1159,7 +301,7 @@ def show_income_form():
                                 db_date,
                                 type_income,
                                 description,
-                                value,
+                                to_cents(value),
                                 st.session_state.username,
                                 cpf_cnpj_clean,
                                 tipo_pessoa
@@ -1170,12 +312,11 @@ def show_income_form():
                                 db_date,
                                 type_income,
                                 description,
-                                value,
+                                to_cents(value),
                                 st.session_state.username
                             )
                     
-                    st.success("Receita registrada com sucesso!")
-                    # REMOVER o time.sleep(1) e st.rerun() - isso causa múltiplas execuções
+                    st.toast("Receita registrada com sucesso!", icon="✅")
                     
                 except Exception as e:
                     st.error(f"Erro ao registrar receita: {str(e)}")
@@ -1237,46 +378,24 @@ def show_main_app():
 def show_dashboard():
     st.title("📊 Dashboard Financeiro")
     
-    # Obter dados
-    expenses = get_expenses(st.session_state.username)
-    incomes = get_incomes(st.session_state.username)
-    
-    # Converter para DataFrame
-    expense_data = []
-    for expense in expenses:
-        expense_data.append({
-            'Data': expense[1],
-            'Origem': expense[2],
-            'Valor': expense[3],
-            'Categoria': expense[4]
-        })
-    
-    income_data = []
-    for income in incomes:
-        income_data.append({
-            'Data': income[1],
-            'Tipo': income[2],
-            'Descrição': income[3],
-            'Valor': income[4]
-        })
-    
-    expense_df = pd.DataFrame(expense_data) if expense_data else pd.DataFrame(columns=['Data', 'Origem', 'Valor', 'Categoria'])
-    income_df = pd.DataFrame(income_data) if income_data else pd.DataFrame(columns=['Data', 'Tipo', 'Descrição', 'Valor'])
-    
-    # Calcular métricas
-    total_expenses = expense_df['Valor'].sum() if not expense_df.empty else 0
-    total_income = income_df['Valor'].sum() if not income_df.empty else 0
+    # Calcular métricas (agregadas no próprio SQLite, em centavos)
+    total_income, total_expenses = get_totals_cached(st.session_state.username)
     balance = total_income - total_expenses
     
     # Exibir métricas
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Total de Receitas", f"R$ {total_income:,.2f}")
+        st.metric("Total de Receitas", f"R$ {from_cents(total_income):,.2f}")
     with col2:
-        st.metric("Total de Despesas", f"R$ {total_expenses:,.2f}")
+        st.metric("Total de Despesas", f"R$ {from_cents(total_expenses):,.2f}")
     with col3:
-        st.metric("Saldo", f"R$ {balance:,.2f}", delta=f"{balance:,.2f}")
+        st.metric("Saldo", f"R$ {from_cents(balance):,.2f}", delta=f"{from_cents(balance):,.2f}")
     
+    show_dashboard_charts()
+
+# Gráficos do dashboard: mudar o período reexecuta só este fragmento
+@st.fragment
+def show_dashboard_charts():
     # Filtros de data
     st.subheader("Filtros")
     col1, col2 = st.columns(2)
@@ -1286,100 +405,175 @@ def show_dashboard():
     with col2:
         end_date = st.date_input("Data final", value=dt_date.today())
     
-    # Aplicar filtros
-    if not expense_df.empty:
-        expense_df['Data'] = pd.to_datetime(expense_df['Data'])
-        filtered_expenses = expense_df[(expense_df['Data'] >= pd.to_datetime(start_date)) & 
-                                      (expense_df['Data'] <= pd.to_datetime(end_date))]
-    else:
-        filtered_expenses = expense_df
-    
-    if not income_df.empty:
-        income_df['Data'] = pd.to_datetime(income_df['Data'])
-        filtered_incomes = income_df[(income_df['Data'] >= pd.to_datetime(start_date)) & 
-                                    (income_df['Data'] <= pd.to_datetime(end_date))]
-    else:
-        filtered_incomes = income_df
+    # Totais por categoria/tipo do resumo mensal: o custo não depende do número de lançamentos
+    expenses_by_category = get_category_totals_cached(st.session_state.username, 'expense', start_date, end_date)
+    expenses_by_category = expenses_by_category.assign(Valor=from_cents(expenses_by_category['total_cents'])).rename(
+        columns={'category': 'Categoria'}).replace({'Categoria': {'': 'Sem categoria'}})
+    incomes_by_type = get_category_totals_cached(st.session_state.username, 'income', start_date, end_date)
+    incomes_by_type = incomes_by_type.assign(Valor=from_cents(incomes_by_type['total_cents'])).rename(
+        columns={'category': 'Tipo'}).replace({'Tipo': {'': 'Sem tipo'}})
     
     # Gráficos
     col1, col2 = st.columns(2)
     
     with col1:
-        if not filtered_expenses.empty:
+        if not expenses_by_category.empty:
             st.subheader("Despesas por Categoria")
-            expenses_by_category = filtered_expenses.groupby('Categoria')['Valor'].sum().reset_index()
+            # Plotly só é carregado quando há gráfico para mostrar
+            import plotly.express as px
             fig = px.pie(expenses_by_category, values='Valor', names='Categoria')
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("Nenhuma despesa registrada no período selecionado.")
     
     with col2:
-        if not filtered_incomes.empty:
+        if not incomes_by_type.empty:
             st.subheader("Receitas por Tipo")
-            incomes_by_type = filtered_incomes.groupby('Tipo')['Valor'].sum().reset_index()
+            import plotly.express as px
             fig = px.pie(incomes_by_type, values='Valor', names='Tipo')
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("Nenhuma receita registrada no período selecionado.")
     
-# Funções para limpar dados
-def clear_user_data(username):
-    """Limpa todos os dados de um usuário específico"""
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
-    
-    try:
-        # Limpar despesas do usuário
-        c.execute('DELETE FROM expenses WHERE user_id = ?', (username,))
-        
-        # Limpar receitas do usuário
-        c.execute('DELETE FROM incomes WHERE user_id = ?', (username,))
-        
-        conn.commit()
-        return True, "Dados limpos com sucesso!"
-    except Exception as e:
-        conn.rollback()
-        return False, f"Erro ao limpar dados: {str(e)}"
-    finally:
-        conn.close()
+    show_cash_flow(start_date, end_date)
 
-def delete_user_completely(username):
-    """Deleta um usuário e todos os seus dados (apenas para admin)"""
-    if username == "admin":
-        return False, "Não é possível deletar o usuário administrador."
-    
-    conn = sqlite3.connect('finance.db')
-    c = conn.cursor()
+# Fluxo de caixa: série calculada e reduzida no banco (no máximo CASH_FLOW_MAX_POINTS pontos)
+CASH_FLOW_GRANULARITIES = {"Automático": None, "Diário": 'day', "Semanal": 'week', "Mensal": 'month'}
+CASH_FLOW_LABELS = {'day': "diário", 'week': "semanal", 'month': "mensal"}
+
+def show_cash_flow(start_date, end_date):
+    st.subheader("Fluxo de Caixa")
+    col1, col2 = st.columns(2)
+    with col1:
+        granularity = CASH_FLOW_GRANULARITIES[st.selectbox("Agrupamento", list(CASH_FLOW_GRANULARITIES))]
+    with col2:
+        whole_history = st.checkbox("Todo o histórico", help="Ignora o período dos filtros")
+    
+    if whole_history:
+        start_date = end_date = None
+    flow, granularity = get_cash_flow_cached(st.session_state.username, start_date, end_date, granularity)
+    if flow.empty:
+        st.info("Nenhum lançamento no período selecionado.")
+        return
+    
+    import plotly.graph_objects as go
+    balance = from_cents(flow['balance_cents'])
+    fig = go.Figure()
+    fig.add_bar(x=flow['period'], y=from_cents(flow['net_cents']), name="Fluxo líquido",
+                marker_color=flow['net_cents'].ge(0).map({True: '#2ca02c', False: '#d62728'}))
+    # Pontos que agrupam vários períodos mostram a faixa entre o menor e o maior saldo
+    if (flow['min_balance_cents'] != flow['max_balance_cents']).any():
+        fig.add_scatter(x=flow['period'], y=from_cents(flow['max_balance_cents']), mode='lines',
+                        line={'width': 0}, showlegend=False, hoverinfo='skip')
+        fig.add_scatter(x=flow['period'], y=from_cents(flow['min_balance_cents']), mode='lines', line={'width': 0},
+                        fill='tonexty', fillcolor='rgba(31, 119, 180, 0.2)', name="Faixa do saldo", hoverinfo='skip')
+    fig.add_scatter(x=flow['period'], y=balance, mode='lines', name="Saldo acumulado", line={'color': '#1f77b4'})
+    fig.update_layout(hovermode='x unified', yaxis_title="R$", legend={'orientation': 'h'})
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(f"Agrupamento {CASH_FLOW_LABELS[granularity]} · {len(flow)} pontos · "
+               f"saldo final R$ {balance.iloc[-1]:,.2f}")
+    
+# Tabelas de lançamentos dos relatórios: só a página atual sai do banco e é
+# desenhada, em um único st.dataframe com seleção de linhas
+REPORT_PAGE_SIZE = 50
+
+REPORT_GRIDS = {
+    'expense': {
+        'title': "Despesas Detalhadas",
+        'load_page': get_expenses_page,
+        'delete': delete_expenses,
+        'restore': restore_expenses,
+        'columns': {'id': 'ID', 'date': 'Data', 'origin': 'Origem', 'category': 'Categoria', 'value_cents': 'Valor',
+                    'cpf_cnpj': 'CPF/CNPJ', 'tipo_pessoa': 'Tipo Pessoa'},
+        'empty': "Nenhuma despesa no período selecionado.",
+    },
+    'income': {
+        'title': "Receitas Detalhadas",
+        'load_page': get_incomes_page,
+        'delete': delete_incomes,
+        'restore': restore_incomes,
+        'columns': {'id': 'ID', 'date': 'Data', 'type': 'Tipo', 'description': 'Descrição', 'value_cents': 'Valor',
+                    'cpf_cnpj': 'CPF/CNPJ', 'tipo_pessoa': 'Tipo Pessoa'},
+        'empty': "Nenhuma receita no período selecionado.",
+    },
+}
+
+@st.fragment
+def show_transaction_grid(kind, start_date, end_date, row_count):
+    """Tabela paginada (keyset em data, id) com seleção de linhas e exclusão em lote.
+
+    Paginação e seleção reexecutam só o fragmento; exclusões reexecutam a página
+    inteira, porque mudam também os totais."""
+    grid = REPORT_GRIDS[kind]
+    st.subheader(grid['title'])
+    
+    # Última exclusão em lote desta tabela, que pode ser desfeita
+    undo_key = f"{kind}_grid_undo"
+    deleted_rows = st.session_state.get(undo_key)
+    if deleted_rows:
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.info(f"{len(deleted_rows)} lançamento(s) excluído(s).")
+        with col2:
+            if st.button("↩️ Desfazer", key=f"{kind}_grid_restore"):
+                grid['restore'](deleted_rows, st.session_state.username)
+                del st.session_state[undo_key]
+                st.rerun()
     
-    try:
-        # Iniciar transação
-        c.execute('BEGIN TRANSACTION')
-        
-        # Limpar despesas do usuário
-        c.execute('DELETE FROM expenses WHERE user_id = ?', (username,))
-        
-        # Limpar receitas do usuário
-        c.execute('DELETE FROM incomes WHERE user_id = ?', (username,))
-        
-        # Deletar o usuário
-        c.execute('DELETE FROM userstable WHERE username = ?', (username,))
-        
-        conn.commit()
-        return True, f"Usuário {username} e todos os seus dados foram deletados com sucesso!"
-    except Exception as e:
-        conn.rollback()
-        return False, f"Erro ao deletar usuário: {str(e)}"
-    finally:
-        conn.close()
+    if row_count == 0:
+        st.info(grid['empty'])
+        return
+    
+    # Cursores (data, id) do início de cada página visitada; trocar o período volta à primeira
+    period = (parse_date_input(start_date), parse_date_input(end_date))
+    pages_key = f"{kind}_grid_pages"
+    if st.session_state.get(pages_key, {}).get('period') != period:
+        st.session_state[pages_key] = {'period': period, 'cursors': [None]}
+    cursors = st.session_state[pages_key]['cursors']
+    
+    page, next_cursor = grid['load_page'](st.session_state.username, start_date, end_date, cursors[-1], REPORT_PAGE_SIZE)
+    # Página esvaziada por exclusões: volta para a anterior
+    while page.empty and len(cursors) > 1:
+        cursors.pop()
+        page, next_cursor = grid['load_page'](st.session_state.username, start_date, end_date, cursors[-1], REPORT_PAGE_SIZE)
+    
+    table = page[list(grid['columns'])].rename(columns=grid['columns'])
+    table['Data'] = format_dates_br(table['Data'])
+    table['Valor'] = from_cents(table['Valor'])
+    
+    # A chave muda com a página e após exclusões, para a seleção não apontar para outras linhas
+    grid_version = st.session_state.get(f"{kind}_grid_version", 0)
+    event = st.dataframe(
+        table,
+        hide_index=True,
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="multi-row",
+        key=f"{kind}_grid_{grid_version}_{period}_{cursors[-1]}",
+        column_config={'Valor': st.column_config.NumberColumn("Valor (R$)", format="%.2f")}
+    )
+    selected_ids = table['ID'].iloc[event.selection.rows].tolist()
+    
+    col1, col2, col3, col4 = st.columns([1, 1, 3, 2])
+    with col1:
+        st.button("⬅️ Anterior", key=f"{kind}_grid_previous", disabled=len(cursors) == 1, on_click=cursors.pop)
+    with col2:
+        st.button("Próxima ➡️", key=f"{kind}_grid_next", disabled=next_cursor is None,
+                  on_click=cursors.append, args=(next_cursor,))
+    with col3:
+        page_count = -(-row_count // REPORT_PAGE_SIZE)
+        st.caption(f"Página {len(cursors)} de {max(page_count, len(cursors))} · {row_count} lançamentos no período")
+    with col4:
+        if st.button(f"🗑️ Excluir selecionadas ({len(selected_ids)})", key=f"{kind}_grid_delete", disabled=not selected_ids):
+            # Um único DELETE em lote; o aviso com "Desfazer" aparece no próximo run
+            st.session_state[undo_key] = grid['delete'](selected_ids, st.session_state.username)
+            st.session_state[f"{kind}_grid_version"] = grid_version + 1
+            st.rerun()
 
 # Relatórios
 def show_reports():
     st.title("📋 Relatórios Financeiros")
     
-    # Obter dados
-    expenses = get_expenses(st.session_state.username)
-    incomes = get_incomes(st.session_state.username)
-    
     # Filtros
     st.subheader("Filtros")
     col1, col2 = st.columns(2)
@@ -1389,134 +583,23 @@ def show_reports():
     with col2:
         end_date = st.date_input("Data final", value=dt_date.today())
     
-    # Filtrar dados
-    filtered_expenses = []
-    for expense in expenses:
-        try:
-            expense_date = datetime.strptime(expense[1], "%Y-%m-%d").date()
-            if start_date <= expense_date <= end_date:
-                filtered_expenses.append(expense)
-        except (ValueError, TypeError):
-            # Se houver erro na conversão da data, pular este registro
-            continue
-    
-    filtered_incomes = []
-    for income in incomes:
-        try:
-            income_date = datetime.strptime(income[1], "%Y-%m-%d").date()
-            if start_date <= income_date <= end_date:
-                filtered_incomes.append(income)
-        except (ValueError, TypeError):
-            # Se houver erro na conversão da data, pular este registro
-            continue
-    
-    # Calcular totais - CORREÇÃO: Esta parte deve estar FORA dos blocos try/except
-    total_expenses = sum(expense[3] for expense in filtered_expenses)
-    total_income = sum(income[4] for income in filtered_incomes)
+    # Calcular totais (resumo mensal, em centavos)
+    total_income, total_expenses = get_summary_totals(st.session_state.username, start_date, end_date)
     balance = total_income - total_expenses
     
     # Exibir resumo
     st.subheader("Resumo do Período")
     col1, col2, col3 = st.columns(3)
-    col1.metric("Total Receitas", f"R$ {total_income:,.2f}")
-    col2.metric("Total Despesas", f"R$ {total_expenses:,.2f}")
-    col3.metric("Saldo", f"R$ {balance:,.2f}", delta=f"{balance:,.2f}")
+    col1.metric("Total Receitas", f"R$ {from_cents(total_income):,.2f}")
+    col2.metric("Total Despesas", f"R$ {from_cents(total_expenses):,.2f}")
+    col3.metric("Saldo", f"R$ {from_cents(balance):,.2f}", delta=f"{from_cents(balance):,.2f}")
     
-    # Tabela de despesas
-    st.subheader("Despesas Detalhadas")
-    if filtered_expenses:
-        expense_data = []
-        for expense in filtered_expenses:
-            # Verificar se os índices existen antes de acessá-los
-            cpf_cnpj = expense[6] if len(expense) > 6 else None
-            tipo_pessoa = expense[7] if len(expense) > 7 else None
-            
-            expense_data.append({
-                'ID': expense[0],
-                'Data': format_brazilian_date(expense[1]),
-                'Origem': expense[2],
-                'Valor': expense[3],
-                'Categoria': expense[4],
-                'CPF/CNPJ': cpf_cnpj,
-                'Tipo Pessoa': tipo_pessoa,
-                'Ações': expense[0]  # ID para ações
-            })
-        
-        expense_df = pd.DataFrame(expense_data)
-        
-        # Adicionar botões de delete
-        for index, row in expense_df.iterrows():
-            col1, col2, col3, col4, col5, col6, col7, col8 = st.columns([1, 2, 1, 1, 2, 2, 1, 1])
-            with col1:
-                st.write(row['ID'])
-            with col2:
-                st.write(row['Origem'])
-            with col3:
-                st.write(row['Data'])
-            with col4:
-                st.write(f"R$ {row['Valor']:,.2f}")
-            with col5:
-                st.write(row['Categoria'])
-            with col6:
-                st.write(row['CPF/CNPJ'] or 'N/A')
-            with col7:
-                st.write(row['Tipo Pessoa'] or 'N/A')
-            with col8:
-                if st.button("🗑️", key=f"detail_delete_expense_{row['ID']}_{index}"):
-                    delete_expense(row['ID'], st.session_state.username)
-                    st.success(f"Despesa {row['ID']} excluída!")
-                    time.sleep(1)
-                    st.rerun()
-    else:
-        st.info("Nenhuma despesa no período selecionado.")
-
-    # Tabela de receitas
-    st.subheader("Receitas Detalhadas")
-    if filtered_incomes:
-        income_data = []
-        for income in filtered_incomes:
-            # Verificar se os índices existen antes de acessá-los
-            cpf_cnpj = income[6] if len(income) > 6 else None
-            tipo_pessoa = income[7] if len(income) > 7 else None
-            
-            income_data.append({
-                'ID': income[0],
-                'Data': format_brazilian_date(income[1]),
-                'Tipo': income[2],
-                'Descrição': income[3],
-                'Valor': income[4],
-                'CPF/CNPJ': cpf_cnpj,
-                'Tipo Pessoa': tipo_pessoa,
-                'Ações': income[0]  # ID para ações
-            })
-        
-        income_df = pd.DataFrame(income_data)
-        
-        # Adicionar botões de delete
-        for index, row in income_df.iterrows():
-            col1, col2, col3, col4, col5, col6, col7, col8 = st.columns([1, 2, 1, 1, 2, 2, 1, 1])
-            with col1:
-                st.write(row['ID'])
-            with col2:
-                st.write(row['Descrição'])
-            with col3:
-                st.write(row['Data'])
-            with col4:
-                st.write(f"R$ {row['Valor']:,.2f}")
-            with col5:
-                st.write(row['Tipo'])
-            with col6:
-                st.write(row['CPF/CNPJ'] or 'N/A')
-            with col7:
-                st.write(row['Tipo Pessoa'] or 'N/A')
-            with col8:
-                if st.button("🗑️", key=f"detail_delete_income_{row['ID']}_{index}"):
-                    delete_income(row['ID'], st.session_state.username)
-                    st.success(f"Receita {row['ID']} excluída!")
-                    time.sleep(1)
-                    st.rerun()
-    else:
-        st.info("Nenhuma receita no período selecionado.")
+    # Tabelas paginadas de despesas e receitas (quantidades do resumo mensal);
+    # cada uma em seu contêiner, para que os fragmentos sejam independentes
+    for kind in ('expense', 'income'):
+        row_count = int(get_category_totals_cached(st.session_state.username, kind, start_date, end_date)['count'].sum())
+        with st.container():
+            show_transaction_grid(kind, start_date, end_date, row_count)
     
     # Tabela de últimas transações
     st.subheader("Últimas Transações")
@@ -1524,25 +607,25 @@ def show_reports():
     # Combinar despesas e receitas
     all_transactions = []
 
-    for expense in expenses[-10:]:  # Últimas 10 despesas
+    for expense in frame_rows(get_recent_expenses_df(st.session_state.username, 10)):  # Últimas 10 despesas
         all_transactions.append({
             'ID': expense[0],
             'Data': format_brazilian_date(expense[1]),
             'Tipo': 'Despesa',
             'Descrição': expense[2],
             'Categoria': expense[4],
-            'Valor': -expense[3],
+            'Valor': -from_cents(expense[3]),
             'Tipo_Transacao': 'expense'
         })
 
-    for income in incomes[-10:]:  # Últimas 10 receitas
+    for income in frame_rows(get_recent_incomes_df(st.session_state.username, 10)):  # Últimas 10 receitas
         all_transactions.append({
             'ID': income[0],
             'Data': format_brazilian_date(income[1]),
             'Tipo': 'Receita',
             'Descrição': income[3],
             'Categoria': income[2],
-            'Valor': income[4],
+            'Valor': from_cents(income[4]),
             'Tipo_Transacao': 'income'
         })
 
@@ -1580,20 +663,23 @@ def show_reports():
                         delete_expense(transaction['ID'], st.session_state.username)
                     else:
                         delete_income(transaction['ID'], st.session_state.username)
-                    st.success("Transação excluída!")
-                    time.sleep(1)
+                    notify("Transação excluída!")
                     st.rerun()
     else:
         st.info("Nenhuma transação registrada.")
     
-    # Opções de exportação
+    show_report_exports(start_date, end_date)
+
+# Exportações do relatório: os botões reexecutam só este fragmento
+@st.fragment
+def show_report_exports(start_date, end_date):
     st.subheader("Exportar Relatório")
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
         if st.button("📄 Exportar para Excel"):
-            excel_data = export_to_excel(filtered_expenses, filtered_incomes)
+            excel_data = export_user_to_excel(st.session_state.username, start_date, end_date)
             st.download_button(
                 label="⬇️ Baixar Arquivo Excel",
                 data=excel_data,
@@ -1603,7 +689,10 @@ def show_reports():
     
     with col2:
         if st.button("🌐 Exportar para HTML"):
-            html_content = export_to_html_with_logo(filtered_expenses, filtered_incomes)
+            # Período completo só é carregado na exportação (em cache até a próxima escrita)
+            expenses_df = get_expenses_df(st.session_state.username, start_date, end_date)
+            incomes_df = get_incomes_df(st.session_state.username, start_date, end_date)
+            html_content = export_to_html_with_logo(expenses_df, incomes_df, username=st.session_state.username)
             st.download_button(
                 label="⬇️ Baixar Relatório HTML",
                 data=html_content,
@@ -1612,12 +701,50 @@ def show_reports():
             )
     
     with col3:
-        if st.button("📊 Gerar Gráficos"):
-            show_charts(filtered_expenses, filtered_incomes)
+        st.button("📊 Gerar Gráficos", on_click=lambda: st.session_state.update(show_report_charts=True))
+    
+    # Os gráficos continuam visíveis nas próximas interações, até serem ocultados
+    if st.session_state.get('show_report_charts'):
+        show_charts(start_date, end_date)
+        st.button("Ocultar Gráficos", on_click=lambda: st.session_state.update(show_report_charts=False))
+
+# Gráficos do relatório: figuras montadas a partir dos agregados e guardadas em
+# cache (JSON) por usuário, período e versão dos dados
+REPORT_CHART_LAYOUT = [
+    ['expenses_by_category', 'incomes_by_type'],
+    ['monthly'],
+    ['top_expense_counterparties', 'top_income_counterparties'],
+]
+
+def show_charts(start_date, end_date):
+    figures = get_report_figures_cached(st.session_state.username, start_date, end_date)
+    if not figures:
+        st.info("Nenhum lançamento no período selecionado.")
+        return
+    
+    for names in REPORT_CHART_LAYOUT:
+        names = [name for name in names if name in figures]
+        if not names:
+            continue
+        for column, name in zip(st.columns(len(names)), names):
+            with column:
+                st.plotly_chart(figures[name], use_container_width=True, key=f"report_chart_{name}")
 
 def show_settings():
     st.title("⚙️ Configurações")
     
+    # Cada seção é um fragmento: interagir com uma não redesenha as outras
+    show_user_settings()
+    show_data_transfer()
+    
+    # Andamento das importações em segundo plano
+    st.subheader("Importações em Andamento")
+    show_import_jobs()
+    
+    show_clear_data()
+
+@st.fragment
+def show_user_settings():
     # Informações do usuário
     st.subheader("Informações do Usuário")
     
@@ -1640,12 +767,13 @@ def show_settings():
             if submitted:
                 if new_nome:
                     update_user_info(st.session_state.username, new_nome, cpf_cnpj, tipo_pessoa)
-                    st.success("Informações atualizadas com sucesso!")
-                    time.sleep(1)
-                    st.rerun()
+                    st.session_state.user_info = (new_nome, cpf_cnpj, tipo_pessoa)
+                    st.toast("Informações atualizadas com sucesso!", icon="✅")
                 else:
                     st.error("O nome completo é obrigatório.")
-    
+
+@st.fragment
+def show_data_transfer():
     # Importação/Exportação de dados
     st.subheader("Importar/Exportar Dados")
 
@@ -1695,29 +823,22 @@ def show_settings():
         
         if uploaded_file:
             if st.button("📤 Importar Dados"):
-                with st.spinner("Importando dados..."):
-                    success, message = import_from_spreadsheet(
-                        uploaded_file, 
-                        st.session_state.username, 
-                        is_income=(import_option == "Receitas")
-                    )
-                    
-                    if success:
-                        st.success(message)
-                        time.sleep(2)
-                        st.rerun()
-                    else:
-                        st.error(message)
+                # A importação roda em segundo plano e continua mesmo se a página for recarregada
+                job_id = get_import_jobs().submit(
+                    uploaded_file, 
+                    st.session_state.username, 
+                    is_income=(import_option == "Receitas")
+                )
+                # Execução completa para o painel de importações começar a se atualizar
+                notify(f"Importação #{job_id} iniciada. Acompanhe o andamento abaixo.", icon="📤")
+                st.rerun()
 
     with col2:
         st.write("**Exportar Dados**")
         
-        # Obter todos os dados
-        all_expenses = get_expenses(st.session_state.username)
-        all_incomes = get_incomes(st.session_state.username)
-        
         if st.button("📥 Exportar Todos os Dados"):
-            excel_data = export_to_excel(all_expenses, all_incomes)
+            # Lê direto do banco para a planilha, linha a linha
+            excel_data = export_user_to_excel(st.session_state.username)
             st.download_button(
                 label="⬇️ Baixar Arquivo Excel",
                 data=excel_data,
@@ -1725,6 +846,21 @@ def show_settings():
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
         
+        # Formatos colunares para ferramentas de análise
+        analysis_format = st.selectbox("Formato para análise", available_analysis_formats())
+        if st.button("📦 Exportar para Análise"):
+            analysis_data, extension, mime = export_for_analysis(
+                get_expenses_df(st.session_state.username),
+                get_incomes_df(st.session_state.username),
+                analysis_format
+            )
+            st.download_button(
+                label=f"⬇️ Baixar {analysis_format}",
+                data=analysis_data,
+                file_name=f"dados_completos_{dt_date.today().strftime('%Y%m%d')}.{extension}",
+                mime=mime
+            )
+        
         # Adicionar opção para baixar template
         if st.button("📋 Baixar Template"):
             # Criar template vazio
@@ -1758,7 +894,10 @@ def show_settings():
                 file_name=f"template_{'despesas' if import_option == 'Despesas' else 'receitas'}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
-    
+
+
+@st.fragment
+def show_clear_data():
     # Limpar dados do usuário atual
     st.subheader("Limpar Meus Dados")
     st.warning("⚠️ Esta ação não pode ser desfeita! Todos os seus registros serão permanentemente excluídos.")
@@ -1776,18 +915,49 @@ def show_settings():
                 with st.spinner("Limpando dados..."):
                     success, message = clear_user_data(st.session_state.username)
                     if success:
-                        st.success(message)
+                        notify(message)
                         st.session_state.confirm_delete = False
-                        time.sleep(2)
                         st.rerun()
                     else:
                         st.error(message)
         
-        # Botão para cancelar
-        if st.button("❌ Cancelar"):
-            st.session_state.confirm_delete = False
-            st.rerun()
+        # Botão para cancelar (o callback roda antes da reexecução do fragmento)
+        st.button("❌ Cancelar", on_click=lambda: st.session_state.update(confirm_delete=False))
                         
+# Painel de importações: o fragmento só se atualiza sozinho (a cada 2 segundos)
+# enquanto há importação em andamento
+def show_import_jobs():
+    # Cria o gerenciador antes da leitura: na primeira vez no processo, ele marca
+    # como interrompidos os jobs de processos que já terminaram
+    get_import_jobs()
+    jobs = get_user_import_jobs(st.session_state.username)
+    polling = any(job[3] in JOB_ACTIVE_STATUSES for job in jobs)
+    st.fragment(import_jobs_panel, run_every=2 if polling else None)(polling)
+
+def import_jobs_panel(polling):
+    jobs = get_user_import_jobs(st.session_state.username)
+    if polling and not any(job[3] in JOB_ACTIVE_STATUSES for job in jobs):
+        # Todas terminaram: a execução completa para a atualização e mostra os dados importados
+        st.rerun()
+    if not jobs:
+        st.info("Nenhuma importação registrada.")
+        return
+    
+    for job_id, file_name, is_income, status, progress, rows, inserted, duplicates, error_count, elapsed, message, created_at in jobs:
+        col1, col2, col3 = st.columns([3, 4, 1])
+        with col1:
+            st.write(f"**#{job_id}** {file_name} ({'Receitas' if is_income else 'Despesas'})")
+            st.caption(f"{format_brazilian_date(created_at[:10])} {created_at[11:16]} · {status}")
+        with col2:
+            st.progress(min(progress or 0.0, 1.0), text=f"{rows or 0} linhas processadas em {elapsed or 0:.1f}s")
+            if message:
+                st.caption(message)
+        with col3:
+            if status in JOB_ACTIVE_STATUSES:
+                if st.button("⏹️", key=f"cancel_import_{job_id}", help="Cancelar importação"):
+                    if not get_import_jobs().cancel(job_id):
+                        st.warning("Esta importação não está em andamento neste servidor.")
+
 # Gerenciamento de usuários (apenas admin)
 def show_user_management():
     st.title("👥 Gerenciamento de Usuários")
@@ -1830,6 +1000,57 @@ def show_user_management():
     else:
         st.info("Nenhum usuário cadastrado.")
     
+    # Seções em fragmentos; só as ações que mudam a lista de usuários recarregam a página
+    show_batch_reports(users)
+    show_summary_rebuild()
+    show_add_user_form()
+    show_remove_user(users)
+    show_delete_user_completely(users)
+
+@st.fragment
+def show_batch_reports(users):
+    # Relatórios de todos os usuários, gerados em paralelo (um processo por núcleo)
+    st.subheader("Relatórios em Lote")
+    col1, col2 = st.columns(2)
+    with col1:
+        batch_start = st.date_input("Data inicial", value=dt_date.today().replace(day=1), key="batch_start")
+    with col2:
+        batch_end = st.date_input("Data final", value=dt_date.today(), key="batch_end")
+    
+    if st.button("🗂️ Gerar Relatórios de Todos os Usuários"):
+        progress_bar = st.progress(0.0, text="Gerando relatórios...")
+        output = io.BytesIO()
+        summary = build_reports_zip(
+            output,
+            [user[0] for user in users],
+            batch_start,
+            batch_end,
+            progress=lambda done, total: progress_bar.progress(done / total, text=f"Relatórios gerados: {done}/{total}")
+        )
+        progress_bar.empty()
+        
+        if summary['errors']:
+            st.warning(f"Falha ao gerar relatórios de {len(summary['errors'])} usuário(s): {', '.join(summary['errors'])}")
+        st.success(f"{summary['files']} arquivos gerados para {summary['users']} usuários em {summary['elapsed']:.1f}s "
+                   f"({summary['workers']} processos)")
+        st.download_button(
+            label="⬇️ Baixar Relatórios (zip)",
+            data=output.getvalue(),
+            file_name=f"relatorios_{batch_start.strftime('%Y%m%d')}_{batch_end.strftime('%Y%m%d')}.zip",
+            mime="application/zip"
+        )
+
+@st.fragment
+def show_summary_rebuild():
+    # O resumo mensal é mantido automaticamente; a reconstrução corrige eventuais divergências
+    st.subheader("Resumo Mensal")
+    if st.button("🔄 Reconstruir Resumo Mensal"):
+        with st.spinner("Recalculando totais mensais..."):
+            rows = rebuild_summary()
+        st.success(f"Resumo mensal reconstruído: {rows} linhas.")
+
+@st.fragment
+def show_add_user_form():
     # Adicionar novo usuário
     st.subheader("Adicionar Novo Usuário")
     
@@ -1865,11 +1086,10 @@ def show_user_management():
                                 new_username, 
                                 make_hashes(new_password), 
                                 nome_completo, 
-                                re.sub(r'[^0-9]', '', cpf_cnpj), 
+                                clean_document(cpf_cnpj), 
                                 tipo_pessoa
                             )
-                            st.success(f"Usuário {new_username} adicionado com sucesso!")
-                            time.sleep(1)
+                            notify(f"Usuário {new_username} adicionado com sucesso!")
                             st.rerun()
                         except sqlite3.IntegrityError:
                             st.error("Nome de usuário já existe. Escolha outro.")
@@ -1879,7 +1099,9 @@ def show_user_management():
                     st.error("As senhas não coincidem.")
             else:
                 st.error("Por favor, preencha todos os campos obrigatórios.")
-    
+
+@st.fragment
+def show_remove_user(users):
     # Remover usuário (apenas remove da tabela de usuários)
     st.subheader("Remover Usuário")
     
@@ -1889,12 +1111,13 @@ def show_user_management():
         if st.button("🗑️ Remover Usuário (apenas conta)"):
             if user_to_delete != "admin":
                 delete_user(user_to_delete)
-                st.success(f"Usuário {user_to_delete} removido com sucesso!")
-                time.sleep(1)
+                notify(f"Usuário {user_to_delete} removido com sucesso!")
                 st.rerun()
             else:
                 st.error("Não é possível remover o usuário administrador.")
-    
+
+@st.fragment
+def show_delete_user_completely(users):
     # Excluir usuário completamente (com todos os dados)
     st.subheader("🚨 Excluir Usuário Completamente")
     st.warning("⚠️ Esta ação exclui o usuário e TODOS os seus dados permanentemente!")
@@ -1918,17 +1141,14 @@ def show_user_management():
                 with st.spinner("Excluindo usuário e dados..."):
                     success, message = delete_user_completely(st.session_state.user_to_delete)
                     if success:
-                        st.success(message)
+                        notify(message)
                         st.session_state.confirm_user_delete = False
-                        time.sleep(2)
                         st.rerun()
                     else:
                         st.error(message)
         
-        # Botão para cancelar
-        if st.button("❌ Cancelar Exclusão"):
-            st.session_state.confirm_user_delete = False
-            st.rerun()
+        # Botão para cancelar (o callback roda antes da reexecução do fragmento)
+        st.button("❌ Cancelar Exclusão", on_click=lambda: st.session_state.update(confirm_user_delete=False))
 
 # Executar a aplicação
 if __name__ == "__main__":
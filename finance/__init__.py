@@ -0,0 +1,5 @@
+# Núcleo do sistema financeiro: acesso a dados, validação, importação e
+# exportação, sem dependência de interface (Streamlit, Plotly, PIL).
+#
+# Importar o pacote não abre o banco nem aplica migrações; quem usa o núcleo
+# chama finance.bootstrap.initialize() antes do primeiro acesso.
@@ -0,0 +1,263 @@
+# Linha de comando para as tarefas pesadas, fora das sessões interativas:
+#
+#   python -m finance import planilha.csv [...] --usuario joao [--receitas]
+#   python -m finance export joao [...] --formato xlsx --saida exportacoes/
+#   python -m finance report relatorios.zip [--usuario joao ...]
+#   python -m finance rollup [--usuario joao] [--saida resumo.csv] [--reconstruir]
+#   python -m finance cashflow joao [--agrupamento month] [--pontos 400] [--saida fluxo.csv]
+#   python -m finance importtime [--modulo app] [--limite 1500]
+#
+# Cada comando imprime um único JSON com os resultados e os tempos (em segundos).
+# Código de saída: 0 sucesso, 1 falha em algum arquivo/usuário, 2 argumentos inválidos.
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from finance.batch import build_reports_zip
+from finance.bootstrap import initialize
+from finance.cashflow import CASH_FLOW_BUCKETS, CASH_FLOW_MAX_POINTS, get_cash_flow
+from finance.dates import parse_date_input
+from finance.db import get_db
+from finance.exporter import (ANALYSIS_EXPORT_FORMATS, available_analysis_formats, export_for_analysis,
+                              export_to_html_with_logo, export_user_to_excel)
+from finance.importer import SpreadsheetFormatError, format_import_message, run_import
+from finance.summary import rebuild_summary
+from finance.transactions import get_expenses_df, get_incomes_df
+from finance.users import get_all_users, get_user_info
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    result['elapsed'] = round(time.perf_counter() - started, 3)
+    return result
+
+def _run_parallel(func, items, workers):
+    # Threads: a gravação passa pelo escritor único do processo de qualquer forma
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(lambda item: _timed(func, item), items))
+
+def _import_file(path, user_id, is_income):
+    try:
+        with open(path, 'rb') as file:
+            result = run_import(file, user_id, is_income)
+    except SpreadsheetFormatError as e:
+        return {'file': path, 'ok': False, 'message': str(e)}
+    except Exception as e:
+        return {'file': path, 'ok': False, 'message': f"Erro ao processar planilha: {str(e)}"}
+    return {
+        'file': path,
+        'ok': True,
+        'rows': result['rows'],
+        'inserted': result['inserted'],
+        'duplicates': result['duplicates'],
+        'error_count': len(result['errors']),
+        'message': format_import_message(result['inserted'], result['errors'], result['duplicates']),
+    }
+
+def command_import(args):
+    if get_user_info(args.usuario) is None:
+        return {'ok': False, 'message': f"Usuário {args.usuario} não encontrado"}
+    results = _run_parallel(lambda path: _import_file(path, args.usuario, args.receitas), args.arquivos, args.paralelo)
+    return {'ok': all(result['ok'] for result in results), 'files': results}
+
+def _analysis_format_names():
+    # Extensão do arquivo -> nome do formato em ANALYSIS_EXPORT_FORMATS
+    return {ANALYSIS_EXPORT_FORMATS[name][0]: name for name in available_analysis_formats()}
+
+def _export_user(user_id, export_format, output_dir, start_date, end_date):
+    if get_user_info(user_id) is None:
+        return {'user': user_id, 'ok': False, 'message': f"Usuário {user_id} não encontrado"}
+    path = os.path.join(output_dir, f"{user_id}.{export_format}")
+    try:
+        if export_format == 'xlsx':
+            data = export_user_to_excel(user_id, start_date, end_date).getvalue()
+        else:
+            expenses = get_expenses_df(user_id, start_date, end_date)
+            incomes = get_incomes_df(user_id, start_date, end_date)
+            if export_format == 'html':
+                data = export_to_html_with_logo(expenses, incomes, username=user_id).encode('utf-8')
+            else:
+                data = export_for_analysis(expenses, incomes, _analysis_format_names()[export_format])[0].getvalue()
+        with open(path, 'wb') as file:
+            file.write(data)
+    except Exception as e:
+        return {'user': user_id, 'ok': False, 'message': str(e)}
+    return {'user': user_id, 'ok': True, 'path': path, 'bytes': len(data)}
+
+def command_export(args):
+    os.makedirs(args.saida, exist_ok=True)
+    results = _run_parallel(lambda user: _export_user(user, args.formato, args.saida, args.inicio, args.fim),
+                            args.usuarios, args.paralelo)
+    return {'ok': all(result['ok'] for result in results), 'users': results}
+
+def command_report(args):
+    users = args.usuario or [user[0] for user in get_all_users()]
+    summary = build_reports_zip(args.saida, users, args.inicio, args.fim, args.processos)
+    summary['ok'] = not summary['errors']
+    summary['path'] = args.saida
+    return summary
+
+ROLLUP_SQL = """
+    SELECT user_id, year_month AS mes, CASE kind WHEN 'expense' THEN 'Despesa' ELSE 'Receita' END AS tipo,
+           category AS categoria, ROUND(total_cents / 100.0, 2) AS total, total_cents AS total_centavos,
+           count AS lancamentos
+    FROM monthly_summary {where}
+    ORDER BY user_id, mes, tipo, categoria
+"""
+
+def command_rollup(args):
+    result = {'ok': True}
+    if args.reconstruir:
+        started = time.perf_counter()
+        rebuild_summary()
+        result['rebuild_elapsed'] = round(time.perf_counter() - started, 3)
+    where, params = "", []
+    if args.usuario:
+        where, params = "WHERE user_id = ?", [args.usuario]
+    with get_db() as conn:
+        summary = pd.read_sql_query(ROLLUP_SQL.format(where=where), conn, params=params)
+    result['rows'] = len(summary)
+    if args.saida:
+        summary.to_csv(args.saida, index=False, sep=';')
+        result['path'] = args.saida
+    else:
+        result['summary'] = summary.to_dict(orient='records')
+    return result
+
+def command_cashflow(args):
+    if get_user_info(args.usuario) is None:
+        return {'ok': False, 'message': f"Usuário {args.usuario} não encontrado"}
+    flow, granularity = get_cash_flow(args.usuario, args.inicio, args.fim, args.agrupamento, args.pontos)
+    flow['period'] = flow['period'].dt.strftime('%Y-%m-%d')
+    result = {'ok': True, 'granularity': granularity, 'rows': len(flow)}
+    if args.saida:
+        flow.to_csv(args.saida, index=False, sep=';')
+        result['path'] = args.saida
+    else:
+        result['cash_flow'] = flow.to_dict(orient='records')
+    return result
+
+# Linha do -X importtime: "import time: self [us] | cumulative | nome" (a indentação do nome dá o nível)
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$')
+
+def measure_import_time(module, top=15):
+    """Importa o módulo em um interpretador novo com -X importtime; retorna o tempo total e os maiores pacotes.
+
+    O interpretador usa um banco temporário: módulos que inicializam o banco na
+    importação (como o app) não tocam no banco real, e o tempo medido inclui as
+    migrações de um banco novo."""
+    with tempfile.TemporaryDirectory(prefix="finance-importtime-") as directory:
+        env = {**os.environ, 'FINANCE_DB_PATH': os.path.join(directory, 'finance.db')}
+        started = time.perf_counter()
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                 capture_output=True, text=True, env=env)
+        wall = time.perf_counter() - started
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f"falha ao importar {module}")
+    
+    # As linhas saem em pós-ordem: os imports diretos do módulo (nível 2) vêm
+    # logo antes da linha do próprio módulo (nível 1)
+    packages, total = [], None
+    for line in process.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative_ms = round(int(match.group(2)) / 1000, 1)
+        if len(match.group(3)) == 1:
+            if match.group(4) == module:
+                total = cumulative_ms
+                break
+            packages = []
+        elif len(match.group(3)) == 3:
+            packages.append({'module': match.group(4), 'cumulative_ms': cumulative_ms})
+    packages.sort(key=lambda package: package['cumulative_ms'], reverse=True)
+    return {'module': module, 'import_ms': total, 'process_ms': round(wall * 1000, 1), 'top': packages[:top]}
+
+def command_importtime(args):
+    try:
+        report = measure_import_time(args.modulo, args.top)
+    except RuntimeError as e:
+        return {'ok': False, 'message': str(e)}
+    report['ok'] = args.limite is None or (report['import_ms'] or 0) <= args.limite
+    if args.limite is not None:
+        report['limit_ms'] = args.limite
+    return report
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m finance", description="Tarefas em lote do sistema financeiro")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def add_period(command):
+        command.add_argument('--inicio', help="data inicial (AAAA-MM-DD)")
+        command.add_argument('--fim', help="data final (AAAA-MM-DD)")
+
+    importer = commands.add_parser('import', help="importa planilhas CSV/Excel")
+    importer.add_argument('arquivos', nargs='+', help="planilhas a importar")
+    importer.add_argument('--usuario', required=True, help="usuário dono dos lançamentos")
+    importer.add_argument('--receitas', action='store_true', help="as planilhas são de receitas (padrão: despesas)")
+    importer.add_argument('--paralelo', type=int, default=2, help="arquivos processados ao mesmo tempo")
+    importer.set_defaults(handler=command_import)
+
+    exporter = commands.add_parser('export', help="exporta os dados de um ou mais usuários")
+    exporter.add_argument('usuarios', nargs='+', help="usuários a exportar")
+    exporter.add_argument('--formato', default='xlsx', choices=['xlsx', 'html'] + list(_analysis_format_names()))
+    exporter.add_argument('--saida', default='.', help="diretório de saída")
+    exporter.add_argument('--paralelo', type=int, default=2, help="usuários exportados ao mesmo tempo")
+    add_period(exporter)
+    exporter.set_defaults(handler=command_export)
+
+    report = commands.add_parser('report', help="relatórios Excel e HTML de todos os usuários em um zip")
+    report.add_argument('saida', help="caminho do arquivo zip de saída")
+    report.add_argument('--usuario', action='append', help="limita aos usuários informados (pode repetir)")
+    report.add_argument('--processos', type=int, default=None, help="número de processos (padrão: núcleos da máquina)")
+    add_period(report)
+    report.set_defaults(handler=command_report)
+
+    rollup = commands.add_parser('rollup', help="totais mensais por usuário e categoria/tipo (tabela monthly_summary)")
+    rollup.add_argument('--reconstruir', action='store_true', help="recalcula o resumo a partir dos lançamentos antes de ler")
+    rollup.add_argument('--usuario', help="limita a um usuário")
+    rollup.add_argument('--saida', help="grava o resumo em CSV em vez de incluí-lo no JSON")
+    rollup.set_defaults(handler=command_rollup)
+
+    cashflow = commands.add_parser('cashflow', help="fluxo líquido e saldo acumulado (centavos) por dia, semana ou mês")
+    cashflow.add_argument('usuario', help="usuário")
+    cashflow.add_argument('--agrupamento', choices=list(CASH_FLOW_BUCKETS), help="padrão: automático pelo tamanho do período")
+    cashflow.add_argument('--pontos', type=int, default=CASH_FLOW_MAX_POINTS, help="máximo de pontos da série")
+    cashflow.add_argument('--saida', help="grava a série em CSV em vez de incluí-la no JSON")
+    add_period(cashflow)
+    cashflow.set_defaults(handler=command_cashflow)
+    
+    importtime = commands.add_parser('importtime', help="tempo de importação do módulo, para acompanhar regressões no cold start")
+    importtime.add_argument('--modulo', default='app', help="módulo a medir (padrão: app)")
+    importtime.add_argument('--top', type=int, default=15, help="quantos pacotes listar")
+    importtime.add_argument('--limite', type=float, default=None, help="falha (código 1) se a importação passar de LIMITE ms")
+    importtime.set_defaults(handler=command_importtime, uses_db=False)
+    return parser
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if (getattr(args, 'inicio', None) is None) != (getattr(args, 'fim', None) is None):
+        parser.error("informe --inicio e --fim juntos")
+    if getattr(args, 'inicio', None) is not None:
+        args.inicio, args.fim = parse_date_input(args.inicio), parse_date_input(args.fim)
+
+    started = time.perf_counter()
+    init = initialize() if getattr(args, 'uses_db', True) else None
+    result = args.handler(args)
+    result = {'command': args.command, **result, 'elapsed': round(time.perf_counter() - started, 3)}
+    if init is not None:
+        result['init'] = init
+    print(json.dumps(result, ensure_ascii=False, default=str))
+    return 0 if result['ok'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# Relatórios em lote: gera Excel e HTML de todos os usuários em paralelo,
+# um processo por núcleo, e grava tudo em um único arquivo zip.
+#
+# Uso sem interface: python -m finance report relatorios.zip [--inicio AAAA-MM-DD --fim AAAA-MM-DD]
+import multiprocessing
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from finance.dates import parse_date_input
+from finance.exporter import export_to_html_with_logo, export_user_to_excel
+from finance.transactions import EXPENSE_COLUMNS, INCOME_COLUMNS, read_frame
+
+def _safe_name(user_id):
+    return re.sub(r'[^\w.-]', '_', str(user_id)) or '_'
+
+def generate_user_reports(user_id, start_date=None, end_date=None):
+    """Executado em um processo filho: retorna [(nome no zip, conteúdo)] do usuário"""
+    if start_date is not None:
+        start_date, end_date = parse_date_input(start_date), parse_date_input(end_date)
+    expenses = read_frame('expenses', EXPENSE_COLUMNS, user_id, start_date, end_date)
+    incomes = read_frame('incomes', INCOME_COLUMNS, user_id, start_date, end_date)
+    excel = export_user_to_excel(user_id, start_date, end_date)
+    html = export_to_html_with_logo(expenses, incomes, username=user_id)
+
+    folder = _safe_name(user_id)
+    return [
+        (f"{folder}/relatorio_financeiro.xlsx", excel.getvalue()),
+        (f"{folder}/relatorio_financeiro.html", html.encode('utf-8')),
+    ]
+
+def build_reports_zip(output, users, start_date=None, end_date=None, workers=None, progress=None):
+    """Gera os relatórios de todos os usuários em um pool de processos e grava o zip em output"""
+    started = time.perf_counter()
+    errors = {}
+    files = 0
+
+    # spawn: o processo do Streamlit tem várias threads, fork não é seguro
+    context = multiprocessing.get_context('spawn')
+    workers = max(1, min(workers or os.cpu_count() or 1, len(users) or 1))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool, \
+            zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+        futures = {pool.submit(generate_user_reports, user, start_date, end_date): user for user in users}
+        for done, future in enumerate(as_completed(futures), start=1):
+            user = futures[future]
+            try:
+                for name, content in future.result():
+                    # xlsx já é compactado
+                    compression = zipfile.ZIP_STORED if name.endswith('.xlsx') else zipfile.ZIP_DEFLATED
+                    archive.writestr(name, content, compress_type=compression)
+                    files += 1
+            except Exception as e:
+                errors[user] = str(e)
+            if progress:
+                progress(done, len(users))
+
+        if errors:
+            archive.writestr('erros.txt', "\n".join(f"{user}: {message}" for user, message in errors.items()))
+
+    return {
+        'users': len(users),
+        'files': files,
+        'errors': errors,
+        'workers': workers,
+        'elapsed': round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,51 @@
+import logging
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava entre processos, as migrações continuam protegidas por BEGIN IMMEDIATE
+    fcntl = None
+
+from finance import db
+from finance.db import process_singleton
+from finance.schema import run_migrations
+from finance.users import create_user
+
+logger = logging.getLogger(__name__)
+
+# Inicialização do banco (migrações e usuário admin): roda uma única vez por
+# processo, fora do caminho dos reruns, e os processos que sobem juntos se
+# revezam por uma trava de arquivo ao lado do banco
+@contextmanager
+def _process_lock(path):
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+@process_singleton
+def initialize():
+    """Prepara o banco uma única vez por processo; retorna os tempos de cada etapa (em segundos)"""
+    started = time.perf_counter()
+    with _process_lock(db.DB_PATH + ".init.lock"):
+        locked = time.perf_counter()
+        schema_version = run_migrations()
+        migrated = time.perf_counter()
+        create_user()
+        seeded = time.perf_counter()
+    
+    timings = {
+        'schema_version': schema_version,
+        'lock_wait': round(locked - started, 4),
+        'migrations': round(migrated - locked, 4),
+        'seed': round(seeded - migrated, 4),
+        'total': round(seeded - started, 4),
+    }
+    logger.info("Banco inicializado: %s", timings)
+    return timings
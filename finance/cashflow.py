@@ -0,0 +1,118 @@
+from datetime import date, timedelta
+
+import pandas as pd
+
+from finance.dates import parse_date_input
+from finance.db import get_db, get_query_cache
+from finance.summary import split_period
+
+# Fluxo de caixa: entradas, saídas, fluxo líquido e saldo acumulado por dia, semana
+# ou mês, calculados no SQLite (GROUP BY + SUM() OVER). Meses inteiros vêm do resumo
+# mensal; dias, semanas e as pontas parciais dos meses vêm dos lançamentos, pelo
+# índice (user_id, date). A série é reduzida no próprio banco a no máximo
+# max_points pontos antes de chegar ao gráfico.
+CASH_FLOW_BUCKETS = {
+    'day': "date",
+    'week': "date(date, '-6 days', 'weekday 1')",  # segunda-feira da semana
+    'month': "substr(date, 1, 7) || '-01'",
+}
+CASH_FLOW_MAX_POINTS = 400
+
+CASH_FLOW_COLUMNS = ['period', 'income_cents', 'expense_cents', 'net_cents', 'balance_cents',
+                     'min_balance_cents', 'max_balance_cents']
+
+def choose_granularity(start_date, end_date):
+    """Agrupamento automático: diário até ~3 meses, semanal até 2 anos, mensal acima disso"""
+    days = (date.fromisoformat(end_date) - date.fromisoformat(start_date)).days + 1
+    if days <= 92:
+        return 'day'
+    if days <= 731:
+        return 'week'
+    return 'month'
+
+def _history_period(conn, user_id):
+    # Primeiro e último mês com lançamentos, pelo resumo mensal
+    first, last = conn.execute("""SELECT MIN(year_month), MAX(year_month) FROM monthly_summary
+                                  WHERE user_id = ? AND year_month != ''""", (user_id,)).fetchone()
+    if first is None:
+        return None, None
+    last_day = (date.fromisoformat(f"{last}-01") + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return f"{first}-01", last_day.isoformat()
+
+def _opening_balance(conn, user_id, start_date):
+    """Saldo (centavos) de tudo que foi lançado antes de start_date"""
+    month_start = start_date[:8] + '01'
+    return conn.execute("""
+        SELECT (SELECT COALESCE(SUM(CASE kind WHEN 'income' THEN total_cents ELSE -total_cents END), 0)
+                FROM monthly_summary WHERE user_id = ? AND year_month != '' AND year_month < ?)
+             + (SELECT COALESCE(SUM(value_cents), 0) FROM incomes WHERE user_id = ? AND date >= ? AND date < ?)
+             - (SELECT COALESCE(SUM(value_cents), 0) FROM expenses WHERE user_id = ? AND date >= ? AND date < ?)
+    """, (user_id, start_date[:7], user_id, month_start, start_date, user_id, month_start, start_date)).fetchone()[0]
+
+def _flow_sources(user_id, granularity, start_date, end_date):
+    """Partes (sql, params) com as colunas (period, income_cents, expense_cents) do período"""
+    sources = []
+    ranges = [(start_date, end_date)]
+    if granularity == 'month':
+        months, ranges = split_period(start_date, end_date)
+        if months is not None:
+            sources.append(("""SELECT year_month || '-01',
+                                      SUM(CASE kind WHEN 'income' THEN total_cents ELSE 0 END),
+                                      SUM(CASE kind WHEN 'expense' THEN total_cents ELSE 0 END)
+                               FROM monthly_summary WHERE user_id = ? AND year_month >= ? AND year_month < ?
+                               GROUP BY year_month""", [user_id, *months]))
+
+    bucket = CASH_FLOW_BUCKETS[granularity]
+    for range_start, range_end in ranges:
+        for table, income, expense in (('incomes', 'value_cents', '0'), ('expenses', '0', 'value_cents')):
+            sources.append((f"SELECT {bucket}, {income}, {expense} FROM {table} WHERE user_id = ? AND date BETWEEN ? AND ?",
+                            [user_id, range_start, range_end]))
+    return sources
+
+def get_cash_flow(user_id, start_date=None, end_date=None, granularity=None, max_points=CASH_FLOW_MAX_POINTS):
+    """Fluxo de caixa do usuário em centavos (todo o histórico ou o período).
+
+    Retorna (DataFrame com CASH_FLOW_COLUMNS, agrupamento usado). O saldo acumulado
+    parte do saldo anterior ao período. Quando há mais de max_points grupos, grupos
+    vizinhos são somados; balance_cents é o saldo no fim de cada ponto e
+    min/max_balance_cents os extremos dentro dele."""
+    with get_db() as conn:
+        if start_date is None:
+            start_date, end_date = _history_period(conn, user_id)
+            if start_date is None:
+                return pd.DataFrame(columns=CASH_FLOW_COLUMNS), granularity or 'month'
+        else:
+            start_date, end_date = parse_date_input(start_date), parse_date_input(end_date)
+        granularity = granularity or choose_granularity(start_date, end_date)
+
+        sources = _flow_sources(user_id, granularity, start_date, end_date)
+        opening = _opening_balance(conn, user_id, start_date)
+        sql = f"""
+            WITH flows(period, income_cents, expense_cents) AS (
+                {' UNION ALL '.join(sql for sql, _ in sources)}
+            ),
+            series AS (
+                SELECT period, SUM(income_cents) AS income_cents, SUM(expense_cents) AS expense_cents,
+                       SUM(income_cents - expense_cents) AS net_cents,
+                       ? + SUM(SUM(income_cents - expense_cents)) OVER (ORDER BY period) AS balance_cents
+                FROM flows GROUP BY period
+            ),
+            bins AS (
+                SELECT *, NTILE(?) OVER (ORDER BY period) AS bin FROM series
+            )
+            SELECT MIN(period) AS period, SUM(income_cents) AS income_cents, SUM(expense_cents) AS expense_cents,
+                   SUM(net_cents) AS net_cents, ? + SUM(SUM(net_cents)) OVER (ORDER BY bin) AS balance_cents,
+                   MIN(balance_cents) AS min_balance_cents, MAX(balance_cents) AS max_balance_cents
+            FROM bins GROUP BY bin ORDER BY bin
+        """
+        params = [value for _, source_params in sources for value in source_params] + [opening, max_points, opening]
+        flow = pd.read_sql_query(sql, conn, params=params)
+
+    flow['period'] = pd.to_datetime(flow['period'], format='ISO8601', errors='coerce')
+    return flow, granularity
+
+def get_cash_flow_cached(user_id, start_date=None, end_date=None, granularity=None, max_points=CASH_FLOW_MAX_POINTS):
+    """Versão em cache de get_cash_flow"""
+    key = ('cashflow', parse_date_input(start_date), parse_date_input(end_date), granularity, max_points)
+    return get_query_cache().get_or_load(user_id, key,
+                                         lambda: get_cash_flow(user_id, start_date, end_date, granularity, max_points))
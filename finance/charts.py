@@ -0,0 +1,92 @@
+import json
+
+import pandas as pd
+
+from finance.cashflow import get_cash_flow_cached
+from finance.dates import parse_date_input
+from finance.db import get_db, get_query_cache
+from finance.money import from_cents
+from finance.summary import get_category_totals_cached
+
+# Gráficos do relatório: montados só a partir de dados já agregados (resumo mensal,
+# fluxo de caixa mensal e um GROUP BY por contraparte) e guardados como JSON do
+# Plotly no cache de consultas, cuja chave já inclui a versão dos dados do usuário.
+# O Plotly só é importado quando alguma figura precisa ser montada.
+CHART_TOP_COUNTERPARTIES = 10
+
+COUNTERPARTY_SOURCES = {
+    'expense': ('expenses', 'origin'),
+    'income': ('incomes', 'description'),
+}
+
+def get_top_counterparties(user_id, kind, start_date, end_date, limit=CHART_TOP_COUNTERPARTIES):
+    """Maiores fornecedores (despesas, por origem) ou doadores (receitas, por descrição) do período, em centavos"""
+    table, column = COUNTERPARTY_SOURCES[kind]
+    with get_db() as conn:
+        return pd.read_sql_query(f"""
+            SELECT COALESCE(NULLIF({column}, ''), 'Sem descrição') AS name, SUM(value_cents) AS total_cents, COUNT(*) AS count
+            FROM {table} WHERE user_id = ? AND date BETWEEN ? AND ?
+            GROUP BY 1 ORDER BY total_cents DESC LIMIT ?
+        """, conn, params=(user_id, start_date, end_date, limit))
+
+def _breakdown_figure(totals, title, empty_label):
+    import plotly.express as px
+
+    data = pd.DataFrame({
+        'Categoria': totals['category'].replace('', empty_label),
+        'Valor': from_cents(totals['total_cents']),
+    })
+    fig = px.pie(data, values='Valor', names='Categoria', title=title)
+    fig.update_traces(hovertemplate="%{label}<br>R$ %{value:,.2f} (%{percent})<extra></extra>")
+    return fig
+
+def _monthly_figure(flow):
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    fig.add_bar(x=flow['period'], y=from_cents(flow['income_cents']), name="Receitas", marker_color='#2ca02c')
+    fig.add_bar(x=flow['period'], y=from_cents(flow['expense_cents']), name="Despesas", marker_color='#d62728')
+    fig.update_layout(title="Receitas e Despesas por Mês", barmode='group', yaxis_title="R$",
+                      xaxis={'tickformat': '%m/%Y', 'dtick': 'M1' if len(flow) <= 24 else None},
+                      legend={'orientation': 'h'})
+    return fig
+
+def _counterparty_figure(counterparties, title, color):
+    import plotly.graph_objects as go
+
+    # Maior valor no topo
+    data = counterparties.iloc[::-1]
+    fig = go.Figure(go.Bar(x=from_cents(data['total_cents']), y=data['name'], orientation='h', marker_color=color,
+                           customdata=data['count'],
+                           hovertemplate="%{y}<br>R$ %{x:,.2f} em %{customdata} lançamento(s)<extra></extra>"))
+    fig.update_layout(title=title, xaxis_title="R$", height=max(300, 40 * len(data) + 120))
+    return fig
+
+def build_report_figures(user_id, start_date, end_date):
+    """Figuras do relatório do período como JSON do Plotly, por nome; seções sem dados ficam de fora"""
+    start_date, end_date = parse_date_input(start_date), parse_date_input(end_date)
+    figures = {}
+
+    expense_totals = get_category_totals_cached(user_id, 'expense', start_date, end_date)
+    if not expense_totals.empty:
+        figures['expenses_by_category'] = _breakdown_figure(expense_totals, "Despesas por Categoria", "Sem categoria")
+    income_totals = get_category_totals_cached(user_id, 'income', start_date, end_date)
+    if not income_totals.empty:
+        figures['incomes_by_type'] = _breakdown_figure(income_totals, "Receitas por Tipo", "Sem tipo")
+
+    flow, _ = get_cash_flow_cached(user_id, start_date, end_date, 'month')
+    if not flow.empty:
+        figures['monthly'] = _monthly_figure(flow)
+
+    for kind, title, color in (('expense', "Maiores Fornecedores", '#d62728'), ('income', "Maiores Doadores", '#2ca02c')):
+        counterparties = get_top_counterparties(user_id, kind, start_date, end_date)
+        if not counterparties.empty:
+            figures[f'top_{kind}_counterparties'] = _counterparty_figure(counterparties, title, color)
+
+    return {name: fig.to_json() for name, fig in figures.items()}
+
+def get_report_figures_cached(user_id, start_date, end_date):
+    """Figuras (dicionários prontos para o Plotly) em cache por usuário, período e versão dos dados"""
+    key = ('charts', parse_date_input(start_date), parse_date_input(end_date))
+    figures = get_query_cache().get_or_load(user_id, key, lambda: build_report_figures(user_id, start_date, end_date))
+    return {name: json.loads(figure) for name, figure in figures.items()}
@@ -0,0 +1,41 @@
+from datetime import date as dt_date
+
+# Funções para formatar data no formato brasileiro
+def format_date_to_br(date_obj):
+    """Converte objeto date para string no formato dd/mm/aaaa"""
+    if isinstance(date_obj, dt_date):
+        return date_obj.strftime("%d/%m/%Y")
+    return date_obj
+
+def format_date_to_db(date_str):
+    """Converte string no formato dd/mm/aaaa para aaaa-mm-dd (formato do banco)"""
+    try:
+        if isinstance(date_str, str) and len(date_str) == 10 and date_str[2] == '/':
+            parts = date_str.split('/')
+            if len(parts) == 3:
+                return f"{parts[2]}-{parts[1]}-{parts[0]}"
+        return date_str
+    except:
+        return date_str
+
+def parse_date_input(date_input):
+    """Converte input de data para formato do banco"""
+    if isinstance(date_input, dt_date):
+        return date_input.strftime("%Y-%m-%d")
+    elif isinstance(date_input, str):
+        return format_date_to_db(date_input)
+    return date_input
+
+def format_brazilian_date(date_str):
+    try:
+        # Converter de YYYY-MM-DD para DD/MM/YYYY
+        if isinstance(date_str, str) and len(date_str) == 10 and date_str[4] == '-':
+            parts = date_str.split('-')
+            if len(parts) == 3:
+                return f"{parts[2]}/{parts[1]}/{parts[0]}"
+        # Se já estiver no formato brasileiro, retornar como está
+        elif isinstance(date_str, str) and len(date_str) == 10 and date_str[2] == '/':
+            return date_str
+        return date_str
+    except:
+        return date_str
@@ -0,0 +1,238 @@
+import functools
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+# Camada de conexão com o banco de dados
+DB_PATH = os.environ.get("FINANCE_DB_PATH", "finance.db")
+
+# PRAGMAs aplicados uma única vez, na abertura de cada conexão do pool.
+# WAL permite que leitores continuem lendo enquanto o escritor grava.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA cache_size = -16000",
+    "PRAGMA temp_store = MEMORY",
+)
+
+def process_singleton(factory):
+    """Cria o objeto na primeira chamada e o reutiliza pelo resto do processo.
+
+    Os módulos importados sobrevivem aos reruns do Streamlit, então o objeto é
+    compartilhado por todas as sessões, como faria o st.cache_resource."""
+    instance = []
+    lock = threading.Lock()
+
+    @functools.wraps(factory)
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+    return get
+
+class ConnectionPool:
+    """Pool de conexões SQLite reutilizáveis entre execuções do script"""
+
+    def __init__(self, db_path, max_idle=8):
+        self.db_path = db_path
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+
+    def _connect(self):
+        # check_same_thread=False: cada rerun do Streamlit roda em uma thread nova,
+        # mas o pool garante que uma conexão seja usada por uma única thread por vez
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        for pragma in SQLITE_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        """Retira uma conexão ociosa do pool (ou abre uma nova)"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def release(self, conn):
+        """Devolve a conexão ao pool (fecha se o pool estiver cheio)"""
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """Empresta uma conexão: commit ao sair normalmente, rollback em caso de erro"""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Fecha todas as conexões ociosas"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+@process_singleton
+def get_connection_pool():
+    """Pool único por processo, compartilhado por todas as sessões"""
+    return ConnectionPool(DB_PATH)
+
+def get_db():
+    """Context manager usado por todas as funções de acesso a dados"""
+    return get_connection_pool().connection()
+
+class DatabaseWriter:
+    """Thread única que serializa as escritas de todas as sessões"""
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="finance-db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, func, *args, on_commit=None):
+        """Enfileira func(conn, *args) e devolve um Future confirmado após o commit.
+
+        on_commit é chamado depois do commit e antes de o Future ser resolvido."""
+        future = Future()
+        self._queue.put((future, func, args, on_commit))
+        return future
+
+    def _run(self):
+        while True:
+            future, func, args, on_commit = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                # Cada tarefa roda em sua própria transação
+                with self._pool.connection() as conn:
+                    result = func(conn, *args)
+                if on_commit is not None:
+                    on_commit()
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+@process_singleton
+def get_db_writer():
+    """Escritor único por processo"""
+    return DatabaseWriter(get_connection_pool())
+
+# Versão dos dados por usuário, gravada no próprio banco: run_write a incrementa
+# na mesma transação de cada escrita com invalidate, venha ela deste processo, da
+# CLI ou de outro servidor (um UPDATE por transação, não por linha, para não pesar
+# nas importações). ALL_USERS marca mudanças que valem para todos os usuários.
+ALL_USERS = '*'
+
+def bump_data_version(conn, user_id=ALL_USERS):
+    """Incrementa a versão dos dados do usuário dentro da transação de conn"""
+    conn.execute("""INSERT INTO data_versions(user_id, version) VALUES (?, 1)
+                    ON CONFLICT(user_id) DO UPDATE SET version = version + 1""", (user_id,))
+
+def read_data_version(user_id):
+    """Versão atual dos dados do usuário (inclui as mudanças de ALL_USERS)"""
+    with get_db() as conn:
+        return conn.execute("SELECT COALESCE(SUM(version), 0) FROM data_versions WHERE user_id IN (?, ?)",
+                            (user_id, ALL_USERS)).fetchone()[0]
+
+def _write_and_bump(conn, func, user_id, *args):
+    result = func(conn, *args)
+    bump_data_version(conn, user_id)
+    return result
+
+def run_write(func, *args, wait=True, invalidate=None):
+    """Executa func(conn, *args) na thread escritora.
+
+    Com wait=False devolve o Future para confirmação assíncrona. invalidate
+    recebe o usuário cujos dados mudaram: a versão dos dados dele é incrementada
+    na mesma transação e o cache local é descartado após o commit."""
+    on_commit = None
+    if invalidate is not None:
+        cache = get_query_cache()
+        on_commit = lambda: cache.bump(invalidate)
+        args = (func, invalidate, *args)
+        func = _write_and_bump
+    future = get_db_writer().submit(func, *args, on_commit=on_commit)
+    return future.result() if wait else future
+
+def _execute(conn, sql, params):
+    return conn.execute(sql, params).rowcount
+
+def execute_write(sql, params=(), wait=True, invalidate=None):
+    """Executa um único comando de escrita pela fila do escritor"""
+    return run_write(_execute, sql, params, wait=wait, invalidate=invalidate)
+
+class QueryCache:
+    """Cache LRU de resultados de consulta por usuário.
+
+    As chaves incluem a versão dos dados do usuário lida do banco a cada consulta,
+    então escritas de qualquer processo invalidam o cache; entradas de versões
+    antigas deixam de ser usadas e saem pelo LRU."""
+
+    def __init__(self, version_loader=read_data_version, max_entries=256):
+        self.max_entries = max_entries
+        self._version_loader = version_loader
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def version(self, user_id):
+        return self._version_loader(user_id)
+
+    def bump(self, user_id):
+        """Descarta os resultados em cache do usuário após uma escrita deste processo"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        """Descarta os resultados em cache de todos os usuários"""
+        with self._lock:
+            self._entries.clear()
+
+    def _get(self, cache_key):
+        with self._lock:
+            if cache_key in self._entries:
+                self._entries.move_to_end(cache_key)
+                return True, self._entries[cache_key]
+        return False, None
+
+    def peek(self, user_id, key):
+        """Retorna o resultado em cache (ou None) sem executar a consulta"""
+        return self._get((user_id, self.version(user_id), key))[1]
+
+    def get_or_load(self, user_id, key, loader):
+        """Retorna o resultado em cache ou executa loader() e o armazena"""
+        version = self.version(user_id)
+        cache_key = (user_id, version, key)
+        found, value = self._get(cache_key)
+        if found:
+            return value
+        value = loader()
+        # Só armazena se nenhuma escrita aconteceu durante a leitura
+        if self.version(user_id) == version:
+            with self._lock:
+                self._entries[cache_key] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+@process_singleton
+def get_query_cache():
+    """Cache de consultas compartilhado por todas as sessões do processo"""
+    return QueryCache()
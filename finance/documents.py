@@ -0,0 +1,95 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Validação de CPF/CNPJ em lote: normaliza e confere os dígitos verificadores
+# de uma coluna inteira com aritmética de matrizes (NumPy)
+CPF_WEIGHTS = (np.arange(10, 1, -1), np.arange(11, 1, -1))
+CNPJ_WEIGHTS = (np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]),
+                np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]))
+
+def normalize_documents(values):
+    """Mantém apenas os dígitos de cada documento; vazios e nulos viram None"""
+    series = values if isinstance(values, pd.Series) else pd.Series(values, dtype=object)
+    present = series.notna()
+    digits = series.astype(str).str.replace(r'\.0$', '', regex=True).str.replace(r'[^0-9]', '', regex=True)
+    
+    # Células numéricas (CSV/Excel) perdem os zeros à esquerda
+    numeric = series.map(lambda value: isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool))
+    lengths = digits.str.len()
+    digits = digits.where(~numeric | (lengths > 11), digits.str.zfill(11))
+    digits = digits.where(~numeric | (lengths <= 11) | (lengths > 14), digits.str.zfill(14))
+    
+    return digits.astype(object).where(present & (digits != ''), None)
+
+def _check_digit(block, weights):
+    remainder = (block @ weights) % 11
+    return np.where(remainder < 2, 0, 11 - remainder)
+
+def _valid_check_digits(digits, length, weights):
+    block = np.frombuffer(''.join(digits).encode('ascii'), dtype=np.uint8).reshape(-1, length).astype(np.int64) - 48
+    base = block[:, :length - 2]
+    digit1 = _check_digit(base, weights[0])
+    digit2 = _check_digit(np.column_stack([base, digit1]), weights[1])
+    repeated = (block == block[:, :1]).all(axis=1)
+    return (block[:, -2] == digit1) & (block[:, -1] == digit2) & ~repeated
+
+def validate_documents(values):
+    """Valida uma coleção de CPFs/CNPJs de uma só vez.
+
+    Retorna um DataFrame (mesmo índice) com as colunas cpf_cnpj (só dígitos),
+    tipo_pessoa (Física/Jurídica pelo tamanho) e valido."""
+    digits = normalize_documents(values)
+    lengths = digits.str.len()
+    tipo_pessoa = np.full(len(digits), None, dtype=object)
+    valid = np.zeros(len(digits), dtype=bool)
+    
+    for length, weights, tipo in ((11, CPF_WEIGHTS, 'Física'), (14, CNPJ_WEIGHTS, 'Jurídica')):
+        mask = (lengths == length).to_numpy()
+        if mask.any():
+            tipo_pessoa[mask] = tipo
+            valid[mask] = _valid_check_digits(digits[mask], length, weights)
+    
+    return pd.DataFrame({'cpf_cnpj': digits, 'tipo_pessoa': tipo_pessoa, 'valido': valid}, index=digits.index)
+
+# Caminho escalar (formulários): as mesmas regras de normalize_documents e
+# _valid_check_digits, sem montar Series/DataFrame para um único documento
+def _normalize_document(value):
+    if pd.isna(value):
+        return None
+    digits = re.sub(r'[^0-9]', '', re.sub(r'\.0$', '', str(value)))
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        digits = digits.zfill(11) if len(digits) <= 11 else digits.zfill(14) if len(digits) <= 14 else digits
+    return digits or None
+
+def _validate_document(value, length, weights):
+    digits = _normalize_document(value)
+    return digits is not None and len(digits) == length and bool(_valid_check_digits([digits], length, weights)[0])
+
+def clean_document(value):
+    """Só os dígitos de um CPF/CNPJ (None se vazio)"""
+    return _normalize_document(value)
+
+# Funções de validação de CPF/CNPJ
+def validate_cpf(cpf):
+    """Valida CPF"""
+    return _validate_document(cpf, 11, CPF_WEIGHTS)
+
+def validate_cnpj(cnpj):
+    """Valida CNPJ"""
+    return _validate_document(cnpj, 14, CNPJ_WEIGHTS)
+
+def format_cpf(cpf):
+    """Formata CPF"""
+    cpf = re.sub(r'[^0-9]', '', cpf)
+    if len(cpf) == 11:
+        return f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}"
+    return cpf
+
+def format_cnpj(cnpj):
+    """Formata CNPJ"""
+    cnpj = re.sub(r'[^0-9]', '', cnpj)
+    if len(cnpj) == 14:
+        return f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+    return cnpj
@@ -0,0 +1,424 @@
+import base64
+import html
+import importlib.util
+import io
+import itertools
+import logging
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from finance.dates import format_brazilian_date, parse_date_input
+from finance.db import get_db
+from finance.money import from_cents
+from finance.transactions import EXPENSE_COLUMNS, INCOME_COLUMNS, get_expenses_df, get_incomes_df
+
+logger = logging.getLogger(__name__)
+
+# Funções para manipulação da logo
+def get_base64_image(image_path):
+    """Converte imagem para base64 (para HTML)"""
+    try:
+        with open(image_path, "rb") as img_file:
+            return base64.b64encode(img_file.read()).decode()
+    except:
+        return ""
+
+# Formatação vetorizada (colunas inteiras) para os relatórios
+def rows_to_frame(rows, columns):
+    """Converte as tuplas do banco (ou um DataFrame já carregado) para DataFrame com as colunas informadas"""
+    if isinstance(rows, pd.DataFrame):
+        return rows
+    frame = pd.DataFrame.from_records(list(rows)) if len(rows) else pd.DataFrame(columns=range(len(columns)))
+    # Bancos antigos podem não ter as últimas colunas; colunas extras (ex.: row_hash) são descartadas
+    for position in range(frame.shape[1], len(columns)):
+        frame[position] = None
+    frame = frame.iloc[:, :len(columns)]
+    frame.columns = columns
+    return frame
+
+def format_dates_br(series):
+    """Datas ISO (AAAA-MM-DD) para DD/MM/AAAA; valores fora do padrão são mantidos"""
+    text = series.astype(object).where(series.notna(), '').astype(str)
+    return text.str.replace(r'^(\d{4})-(\d{2})-(\d{2})$', r'\3/\2/\1', regex=True)
+
+def format_currency(series):
+    """Valores em centavos no formato 1,234.56 (reais)"""
+    return from_cents(pd.to_numeric(series, errors='coerce').fillna(0)).map('{:,.2f}'.format)
+
+def format_documents(cpf_cnpj, tipo_pessoa):
+    """Aplica a máscara de CPF (pessoa física) ou CNPJ às colunas; vazios viram N/A"""
+    digits = cpf_cnpj.astype(object).where(cpf_cnpj.notna(), '').astype(str).str.replace(r'[^0-9]', '', regex=True)
+    cpf = digits.str.replace(r'^(\d{3})(\d{3})(\d{3})(\d{2})$', r'\1.\2.\3-\4', regex=True)
+    cnpj = digits.str.replace(r'^(\d{2})(\d{3})(\d{3})(\d{4})(\d{2})$', r'\1.\2.\3/\4-\5', regex=True)
+    formatted = cnpj.where(tipo_pessoa != 'Física', cpf)
+    return formatted.where(digits != '', 'N/A')
+
+def escape_html(series):
+    """Escapa &, <, > e aspas de uma coluna de texto"""
+    text = series.astype(object).where(series.notna(), '').astype(str)
+    for char, entity in (('&', '&amp;'), ('<', '&lt;'), ('>', '&gt;'), ('"', '&quot;'), ("'", '&#x27;')):
+        text = text.str.replace(char, entity, regex=False)
+    return text
+
+# Exportação: conversão colunar única das linhas do banco para as colunas das planilhas
+EXPENSE_EXPORT_HEADERS = ['ID', 'Data', 'Origem', 'Valor', 'Categoria', 'UserID', 'CPF_CNPJ', 'Tipo_Pessoa']
+INCOME_EXPORT_HEADERS = ['ID', 'Data', 'Tipo', 'Descrição', 'Valor', 'UserID', 'CPF_CNPJ', 'Tipo_Pessoa']
+
+def export_frames(expenses, incomes):
+    """Despesas e receitas (tuplas ou DataFrames) com datas DD/MM/AAAA e cabeçalhos de exportação"""
+    frames = []
+    for rows, columns, headers in ((expenses, EXPENSE_COLUMNS, EXPENSE_EXPORT_HEADERS),
+                                   (incomes, INCOME_COLUMNS, INCOME_EXPORT_HEADERS)):
+        df = rows_to_frame(rows, columns).copy()
+        df['date'] = format_dates_br(df['date'])
+        df['value_cents'] = from_cents(pd.to_numeric(df['value_cents'], errors='coerce'))
+        df.columns = headers
+        frames.append(df)
+    return frames
+
+def frame_records(df):
+    """Linhas de um DataFrame como tuplas, com None no lugar de valores ausentes"""
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+def combined_export_frame(expense_df, income_df):
+    """Despesas e receitas em uma única tabela (formato do CSV)"""
+    expenses = pd.DataFrame({
+        'Tipo': 'Despesa',
+        'Data': expense_df['Data'],
+        'Descrição': expense_df['Origem'],
+        'Valor': -pd.to_numeric(expense_df['Valor']),
+        'Categoria': expense_df['Categoria'],
+        'CPF/CNPJ': expense_df['CPF_CNPJ'],
+        'Tipo Pessoa': expense_df['Tipo_Pessoa'],
+    })
+    incomes = pd.DataFrame({
+        'Tipo': 'Receita',
+        'Data': income_df['Data'],
+        'Descrição': income_df['Descrição'],
+        'Valor': pd.to_numeric(income_df['Valor']),
+        'Categoria': income_df['Tipo'],
+        'CPF/CNPJ': income_df['CPF_CNPJ'],
+        'Tipo Pessoa': income_df['Tipo_Pessoa'],
+    })
+    return pd.concat([expenses, incomes], ignore_index=True)
+
+def _write_sheet(workbook, name, headers, rows):
+    """Escreve as linhas em ordem (exigência do modo constant_memory) e retorna o total da coluna Valor.
+
+    A aba só é criada se houver ao menos uma linha. O total é acumulado em centavos."""
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        return 0
+    
+    sheet = workbook.add_worksheet(name)
+    sheet.write_row(0, 0, headers)
+    value_index = headers.index('Valor')
+    total_cents = 0
+    row_number = 1
+    for row in itertools.chain([first], rows):
+        sheet.write_row(row_number, 0, row)
+        total_cents += round((row[value_index] or 0) * 100)
+        row_number += 1
+    return from_cents(total_cents)
+
+def write_excel_report(output, expense_rows, income_rows):
+    """Grava as abas Despesas, Receitas e Resumo com o xlsxwriter em modo constant_memory.
+
+    As linhas podem vir de qualquer iterável (inclusive um cursor do SQLite): só a
+    linha corrente fica na memória."""
+    import xlsxwriter
+    
+    workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'nan_inf_to_errors': True})
+    total_expenses = _write_sheet(workbook, 'Despesas', EXPENSE_EXPORT_HEADERS, expense_rows)
+    total_income = _write_sheet(workbook, 'Receitas', INCOME_EXPORT_HEADERS, income_rows)
+    
+    # Adicionar resumo
+    summary = workbook.add_worksheet('Resumo')
+    summary.write_row(0, 0, ['Metrica', 'Valor'])
+    summary.write_row(1, 0, ['Total de Despesas', total_expenses])
+    summary.write_row(2, 0, ['Total de Receitas', total_income])
+    summary.write_row(3, 0, ['Saldo', total_income - total_expenses])
+    workbook.close()
+
+# Função para exportar dados para Excel
+def export_to_excel(expenses, incomes):
+    expense_df, income_df = export_frames(expenses, incomes)
+    
+    # Criar arquivo Excel em memória
+    output = io.BytesIO()
+    
+    try:
+        # Tentar usar xlsxwriter primeiro
+        write_excel_report(output, frame_records(expense_df), frame_records(income_df))
+    except ImportError:
+        # Se xlsxwriter não estiver disponível, tentar openpyxl
+        try:
+            with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                if not expense_df.empty:
+                    expense_df.to_excel(writer, sheet_name='Despesas', index=False)
+                if not income_df.empty:
+                    income_df.to_excel(writer, sheet_name='Receitas', index=False)
+                
+                # Adicionar resumo
+                total_expenses = pd.to_numeric(expense_df['Valor']).sum()
+                total_income = pd.to_numeric(income_df['Valor']).sum()
+                summary_df = pd.DataFrame({
+                    'Metrica': ['Total de Despesas', 'Total de Receitas', 'Saldo'],
+                    'Valor': [total_expenses, total_income, total_income - total_expenses]
+                })
+                summary_df.to_excel(writer, sheet_name='Resumo', index=False)
+        except ImportError:
+            # Se nenhum engine do Excel estiver disponível, usar CSV
+            logger.warning("Bibliotecas Excel não disponíveis. Exportando como CSV.")
+            
+            combined_df = combined_export_frame(expense_df, income_df)
+            if not combined_df.empty:
+                output = io.BytesIO(combined_df.to_csv(index=False, sep=';').encode())
+            else:
+                output = io.BytesIO(b"Nenhum dado para exportar")
+    
+    output.seek(0)
+    return output
+
+def _iter_export_rows(conn, table, columns, user_id, start_date=None, end_date=None):
+    # Lê direto do cursor, convertendo só a data e o valor (centavos -> reais) de cada linha
+    value_index = columns.index('value_cents')
+    sql = f"SELECT {', '.join(columns)} FROM {table} WHERE user_id = ?"
+    params = [user_id]
+    if start_date is not None:
+        sql += " AND date BETWEEN ? AND ?"
+        params += [parse_date_input(start_date), parse_date_input(end_date)]
+    for row in conn.execute(sql + " ORDER BY date, id", params):
+        row = (row[0], format_brazilian_date(row[1])) + row[2:]
+        if row[value_index] is not None:
+            row = row[:value_index] + (from_cents(row[value_index]),) + row[value_index + 1:]
+        yield row
+
+def export_user_to_excel(user_id, start_date=None, end_date=None):
+    """Exporta os dados do usuário (todos ou do período) direto do banco para o Excel, sem DataFrames"""
+    output = io.BytesIO()
+    try:
+        with get_db() as conn:
+            write_excel_report(
+                output,
+                _iter_export_rows(conn, 'expenses', EXPENSE_COLUMNS, user_id, start_date, end_date),
+                _iter_export_rows(conn, 'incomes', INCOME_COLUMNS, user_id, start_date, end_date)
+            )
+    except ImportError:
+        # Sem xlsxwriter: mesmo caminho (com fallbacks) da exportação a partir de DataFrames
+        return export_to_excel(get_expenses_df(user_id, start_date, end_date), get_incomes_df(user_id, start_date, end_date))
+    output.seek(0)
+    return output
+
+# Exportação para análise: formatos colunares, com datas e números tipados
+def analysis_frame(expenses, incomes):
+    """Despesas e receitas em uma única tabela longa, com dtypes corretos"""
+    expense_df = rows_to_frame(expenses, EXPENSE_COLUMNS)
+    income_df = rows_to_frame(incomes, INCOME_COLUMNS)
+    frame = pd.concat([
+        pd.DataFrame({
+            'tipo': 'Despesa',
+            'id': expense_df['id'],
+            'data': expense_df['date'],
+            'descricao': expense_df['origin'],
+            'categoria': expense_df['category'],
+            'valor': from_cents(pd.to_numeric(expense_df['value_cents'])),
+            'valor_centavos': expense_df['value_cents'],
+            'cpf_cnpj': expense_df['cpf_cnpj'],
+            'tipo_pessoa': expense_df['tipo_pessoa'],
+        }),
+        pd.DataFrame({
+            'tipo': 'Receita',
+            'id': income_df['id'],
+            'data': income_df['date'],
+            'descricao': income_df['description'],
+            'categoria': income_df['type'],
+            'valor': from_cents(pd.to_numeric(income_df['value_cents'])),
+            'valor_centavos': income_df['value_cents'],
+            'cpf_cnpj': income_df['cpf_cnpj'],
+            'tipo_pessoa': income_df['tipo_pessoa'],
+        }),
+    ], ignore_index=True)
+    
+    frame['data'] = pd.to_datetime(frame['data'], format='ISO8601', errors='coerce')
+    return frame.astype({
+        'tipo': 'category',
+        'id': 'int64',
+        'descricao': 'string',
+        'categoria': 'category',
+        'valor': 'float64',
+        'valor_centavos': 'Int64',
+        'cpf_cnpj': 'string',
+        'tipo_pessoa': 'category',
+    })
+
+def _analysis_csv(frame, method):
+    output = io.BytesIO()
+    frame.to_csv(output, index=False, sep=';', date_format='%Y-%m-%d', compression={'method': method})
+    return output
+
+def _analysis_parquet(frame):
+    output = io.BytesIO()
+    frame.to_parquet(output, index=False, compression='zstd')
+    return output
+
+def _analysis_feather(frame):
+    output = io.BytesIO()
+    frame.to_feather(output, compression='zstd')
+    return output
+
+# Formato: (extensão, tipo MIME, módulo opcional necessário, função de escrita)
+ANALYSIS_EXPORT_FORMATS = {
+    "Parquet": ("parquet", "application/vnd.apache.parquet", "pyarrow", _analysis_parquet),
+    "Arrow/Feather": ("arrow", "application/vnd.apache.arrow.file", "pyarrow", _analysis_feather),
+    "CSV (gzip)": ("csv.gz", "application/gzip", None, lambda frame: _analysis_csv(frame, 'gzip')),
+    "CSV (zstd)": ("csv.zst", "application/zstd", "zstandard", lambda frame: _analysis_csv(frame, 'zstd')),
+}
+
+def available_analysis_formats():
+    """Formatos cujas dependências estão instaladas"""
+    return [name for name, (_, _, module, _) in ANALYSIS_EXPORT_FORMATS.items()
+            if module is None or importlib.util.find_spec(module) is not None]
+
+def export_for_analysis(expenses, incomes, export_format):
+    """Gera o arquivo no formato escolhido; retorna (BytesIO, extensão, tipo MIME)"""
+    extension, mime, _, writer = ANALYSIS_EXPORT_FORMATS[export_format]
+    output = writer(analysis_frame(expenses, incomes))
+    output.seek(0)
+    return output, extension, mime
+
+def _html_rows(columns):
+    """Monta as linhas <tr> de uma tabela concatenando colunas já formatadas"""
+    row = '<tr><td>' + columns[0]
+    for column in columns[1:]:
+        row = row + '</td><td>' + column
+    return (row + '</td></tr>\n').tolist()
+
+HTML_REPORT_STYLE = """
+        <style>
+            body { font-family: Arial, sans-serif; margin: 40px; color: #333; }
+            .header {
+                display: flex;
+                align-items: center;
+                margin-bottom: 30px;
+                border-bottom: 2px solid #4CAF50;
+                padding-bottom: 20px;
+            }
+            .logo {
+                margin-right: 20px;
+            }
+            .title {
+                color: #2E7D32;
+            }
+            table {
+                border-collapse: collapse;
+                width: 100%;
+                margin-top: 20px;
+            }
+            th, td {
+                border: 1px solid #ddd;
+                padding: 12px;
+                text-align: left;
+            }
+            th {
+                background-color: #4CAF50;
+                color: white;
+            }
+            tr:nth-child(even) {
+                background-color: #f2f2f2;
+            }
+            .summary {
+                margin-top: 30px;
+                padding: 20px;
+                background-color: #E8F5E9;
+                border-radius: 5px;
+            }
+            .footer {
+                margin-top: 50px;
+                text-align: center;
+                font-size: 0.8em;
+                color: #777;
+            }
+        </style>
+"""
+
+def iter_html_report(expenses, incomes, username, chunk_rows=2000):
+    """Gera o relatório HTML em pedaços (cabeçalho, blocos de chunk_rows linhas, rodapé)"""
+    expense_df = rows_to_frame(expenses, EXPENSE_COLUMNS)
+    income_df = rows_to_frame(incomes, INCOME_COLUMNS)
+    
+    # Calcular totais
+    total_expenses = from_cents(pd.to_numeric(expense_df['value_cents'], errors='coerce').sum())
+    total_income = from_cents(pd.to_numeric(income_df['value_cents'], errors='coerce').sum())
+    balance = total_income - total_expenses
+    
+    # Verificar se a logo existe e converter para base64
+    logo_base64 = ""
+    logo_path = "logo_igreja.png"
+    if os.path.exists(logo_path):
+        logo_base64 = get_base64_image(logo_path)
+    logo_html = f"<img class='logo' src='data:image/png;base64,{logo_base64}' alt='Logo Igreja' width='100'>" if logo_base64 else ""
+    now = datetime.now()
+    
+    yield f"""<!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="UTF-8">
+        <title>Relatório Financeiro - Igreja Batista Ágape</title>
+{HTML_REPORT_STYLE}
+    </head>
+    <body>
+        <div class="header">
+            {logo_html}
+            <div>
+                <h1 class="title">Relatório Financeiro</h1>
+                <h2>Igreja Batista Ágape</h2>
+                <p>Usuário: {html.escape(username or '')}</p>
+                <p>Data do relatório: {now.strftime('%d/%m/%Y às %H:%M')}</p>
+            </div>
+        </div>
+        
+        <div class="summary">
+            <h3>Resumo Financeiro</h3>
+            <p><strong>Total de Receitas:</strong> R$ {total_income:,.2f}</p>
+            <p><strong>Total de Despesas:</strong> R$ {total_expenses:,.2f}</p>
+            <p><strong>Saldo:</strong> R$ {balance:,.2f}</p>
+        </div>
+"""
+    
+    sections = (
+        ("Despesas", ["Data", "Origem", "Categoria", "CPF/CNPJ", "Tipo Pessoa", "Valor (R$)"], expense_df, ['origin', 'category']),
+        ("Receitas", ["Data", "Tipo", "Descrição", "CPF/CNPJ", "Tipo Pessoa", "Valor (R$)"], income_df, ['type', 'description']),
+    )
+    for title, headers, df, text_columns in sections:
+        if df.empty:
+            continue
+        yield f"<h2>{title}</h2>\n<table>\n<tr>" + "".join(f"<th>{header}</th>" for header in headers) + "</tr>\n"
+        # Formata cada bloco de uma vez, coluna a coluna
+        for start in range(0, len(df), chunk_rows):
+            block = df.iloc[start:start + chunk_rows]
+            yield "".join(_html_rows([
+                format_dates_br(block['date']),
+                escape_html(block[text_columns[0]]),
+                escape_html(block[text_columns[1]]),
+                format_documents(block['cpf_cnpj'], block['tipo_pessoa']),
+                escape_html(block['tipo_pessoa'].astype(object).where(block['tipo_pessoa'].notna(), 'N/A')),
+                format_currency(block['value_cents']),
+            ]))
+        yield "</table>\n"
+    
+    yield f"""
+        <div class="footer">
+            Relatório gerado em {now.strftime('%d/%m/%Y %H:%M')} | Sistema de Controle Financeiro - Igreja Batista Ágape
+        </div>
+    </body>
+    </html>
+"""
+
+# Função para exportar relatório em HTML com logo
+def export_to_html_with_logo(expenses, incomes, filters=None, username=""):
+    # Retornar o conteúdo HTML para download (junção única dos pedaços gerados)
+    return "".join(iter_html_report(expenses, incomes, username))
@@ -0,0 +1,272 @@
+import hashlib
+import os
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from finance.db import run_write
+from finance.documents import validate_documents
+from finance.money import series_to_cents
+from finance.transactions import EXPENSE_IMPORT_SQL, INCOME_IMPORT_SQL
+
+# Importação em lote: validação vetorizada sobre a planilha inteira e gravação
+# com executemany em transações de até IMPORT_CHUNK_SIZE linhas
+IMPORT_CHUNK_SIZE = 5000
+
+def parse_dates_vectorized(series):
+    """Converte uma coluna de datas (DD/MM/AAAA, AAAA-MM-DD ou datas do Excel) para Timestamp; inválidas viram NaT"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    text = series.astype(str).str.strip()
+    dates = pd.to_datetime(text, format="%d/%m/%Y", errors="coerce")
+    return dates.fillna(pd.to_datetime(text, format="ISO8601", errors="coerce"))
+
+def extract_documents(df):
+    """Extrai CPF/CNPJ e tipo de pessoa das colunas CPF, CNPJ e CPF_CNPJ (a última presente prevalece)"""
+    cpf_cnpj = pd.Series(None, index=df.index, dtype=object)
+    tipo_pessoa = pd.Series(None, index=df.index, dtype=object)
+    
+    for column in ('CPF', 'CNPJ', 'CPF_CNPJ'):
+        if column not in df.columns:
+            continue
+        documents = validate_documents(df[column])
+        present = documents['cpf_cnpj'].notna()
+        tipo = documents['tipo_pessoa']
+        if column == 'CNPJ':
+            tipo = pd.Series('Jurídica', index=df.index, dtype=object)
+        cpf_cnpj = cpf_cnpj.where(~present, documents['cpf_cnpj'])
+        tipo_pessoa = tipo_pessoa.where(~present, tipo)
+    
+    return cpf_cnpj, tipo_pessoa
+
+def prepare_import_rows(df, user_id, is_income=False):
+    """Valida a planilha inteira e devolve (DataFrame na ordem das colunas do INSERT, erros por linha)"""
+    dates = parse_dates_vectorized(df['Data'])
+    # inf/1e999 passam pelo to_numeric, mas não são valores válidos
+    values = pd.to_numeric(df['Valor'], errors='coerce')
+    values = values.where(np.isfinite(values))
+    cpf_cnpj, tipo_pessoa = extract_documents(df)
+    
+    # Linha da planilha = índice + 2 (cabeçalho e base 1)
+    errors = []
+    invalid_dates = dates.isna()
+    invalid_values = values.isna() & ~invalid_dates
+    for index in df.index[invalid_dates]:
+        errors.append(f"Linha {index + 2}: data inválida ({df.at[index, 'Data']})")
+    for index in df.index[invalid_values]:
+        errors.append(f"Linha {index + 2}: valor inválido ({df.at[index, 'Valor']})")
+    
+    def text(column):
+        return df[column].astype(object).where(df[column].notna(), None)
+    
+    if is_income:
+        records = pd.DataFrame({
+            'date': dates.dt.strftime("%Y-%m-%d"),
+            'type': text('Tipo'),
+            'description': text('Descrição'),
+            'value_cents': series_to_cents(values),
+        })
+    else:
+        records = pd.DataFrame({
+            'date': dates.dt.strftime("%Y-%m-%d"),
+            'origin': text('Origem'),
+            'value_cents': series_to_cents(values),
+            'category': text('Categoria'),
+        })
+    records['user_id'] = user_id
+    records['cpf_cnpj'] = cpf_cnpj
+    records['tipo_pessoa'] = tipo_pessoa
+    
+    valid = ~(invalid_dates | invalid_values)
+    return records[valid], errors
+
+def fingerprint_records(records, is_income=False, seen=None):
+    """Hash de conteúdo (usuário, data, valor, descrição/origem, categoria/tipo, CPF/CNPJ) de cada registro.
+
+    A n-ésima repetição do mesmo conteúdo dentro do arquivo recebe um hash próprio:
+    lançamentos idênticos legítimos são mantidos e reenviar o arquivo não duplica nada.
+    seen carrega a contagem de repetições entre blocos da mesma importação."""
+    text_columns = ['type', 'description'] if is_income else ['origin', 'category']
+    # O valor entra na chave em reais com duas casas, como nas versões anteriores,
+    # para que os hashes de importações já gravadas continuem valendo
+    key = (records['user_id'].astype(str) + '|' + records['date'].astype(str) + '|' +
+           (records['value_cents'].astype('float64') / 100).map('{:.2f}'.format))
+    for column in text_columns + ['cpf_cnpj']:
+        key = key + '|' + records[column].astype(object).where(records[column].notna(), '').astype(str)
+    
+    occurrence = key.groupby(key).cumcount()
+    if seen is not None:
+        key_ids = pd.util.hash_pandas_object(key, index=False)
+        occurrence = occurrence + key_ids.map(lambda key_id: seen.get(key_id, 0))
+        for key_id, count in key_ids.value_counts().items():
+            seen[key_id] = seen.get(key_id, 0) + count
+    
+    payload = key + '|' + occurrence.astype(str)
+    return payload.map(lambda text: hashlib.sha256(text.encode('utf-8')).hexdigest())
+
+def _insert_many(conn, sql, rows):
+    # rowcount não conta as linhas ignoradas pelo INSERT OR IGNORE nem as
+    # alterações feitas pelos triggers do resumo mensal
+    return conn.executemany(sql, rows).rowcount
+
+def submit_bulk_insert(records, user_id, is_income=False, chunk_size=IMPORT_CHUNK_SIZE):
+    """Enfileira os registros no escritor em blocos de chunk_size linhas, sem aguardar.
+
+    Retorna a lista de (índices do bloco, quantidade de linhas, Future)."""
+    sql = INCOME_IMPORT_SQL if is_income else EXPENSE_IMPORT_SQL
+    pending = []
+    for start in range(0, len(records), chunk_size):
+        chunk = records.iloc[start:start + chunk_size]
+        rows = list(chunk.astype(object).itertuples(index=False, name=None))
+        future = run_write(_insert_many, sql, rows, wait=False, invalidate=user_id)
+        pending.append((chunk.index, len(rows), future))
+    return pending
+
+def collect_bulk_insert(pending):
+    """Aguarda as confirmações dos blocos e retorna (inseridas, duplicadas ignoradas, erros por bloco)"""
+    inserted = 0
+    duplicates = 0
+    errors = []
+    for index, size, future in pending:
+        try:
+            count = future.result()
+            inserted += count
+            duplicates += size - count
+        except Exception as e:
+            errors.append(f"Linhas {index[0] + 2} a {index[-1] + 2}: {str(e)}")
+    return inserted, duplicates, errors
+
+def format_import_message(success_count, errors, duplicate_count=0, max_errors=5, title="Importação concluída"):
+    """Mensagem de resumo da importação com as primeiras linhas com erro"""
+    message = (f"{title}: {success_count} registros importados, "
+               f"{duplicate_count} duplicados ignorados, {len(errors)} erros.")
+    if errors:
+        message += " " + "; ".join(errors[:max_errors])
+        if len(errors) > max_errors:
+            message += f"; ... (+{len(errors) - max_errors})"
+    return message
+
+# Leitura da planilha em blocos: o arquivo nunca é carregado inteiro na memória
+def _file_size(file):
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(position)
+    return size
+
+def _iter_xlsx_chunks(file, chunk_size):
+    from openpyxl import load_workbook
+    
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        # Mesma aba que o pd.read_excel usaria (a primeira)
+        sheet = workbook.worksheets[0]
+        total_rows = sheet.max_row or 0
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        width = len(columns)
+        
+        batch, index = [], []
+        # O índice segue a numeração do pandas (linha da planilha - 2)
+        for position, row in enumerate(rows):
+            if all(value is None for value in row):
+                continue
+            row = tuple(row[:width])
+            batch.append(row + (None,) * (width - len(row)))
+            index.append(position)
+            if len(batch) == chunk_size:
+                yield pd.DataFrame(batch, columns=columns, index=index), (position + 2) / max(total_rows, 1)
+                batch, index = [], []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns, index=index), 1.0
+    finally:
+        workbook.close()
+
+def iter_spreadsheet_chunks(file, chunk_size=IMPORT_CHUNK_SIZE):
+    """Lê CSV/XLSX em blocos; produz (DataFrame do bloco, fração do arquivo já lida)"""
+    name = file.name.lower()
+    if name.endswith('.csv'):
+        size = _file_size(file)
+        for chunk in pd.read_csv(file, sep=';', chunksize=chunk_size):
+            yield chunk, (file.tell() / size if size else 1.0)
+    elif name.endswith('.xlsx'):
+        yield from _iter_xlsx_chunks(file, chunk_size)
+    else:
+        # .xls não tem leitor em modo streaming: lê de uma vez
+        yield pd.read_excel(file), 1.0
+
+# Máximo de blocos lidos aguardando o escritor (mantém a memória constante)
+IMPORT_MAX_PENDING = 2
+
+class SpreadsheetFormatError(ValueError):
+    """Planilha sem as colunas obrigatórias"""
+
+def run_import(file, user_id, is_income=False, progress=None, chunk_size=IMPORT_CHUNK_SIZE, cancel_event=None):
+    """Importa despesas/receitas de CSV ou Excel, bloco a bloco.
+
+    progress, se informado, é chamado como progress(fração lida, linhas processadas).
+    Se cancel_event for sinalizado, a leitura para no próximo bloco (os blocos já
+    enviados ao escritor são gravados). Retorna um dicionário com as contagens."""
+    # Verificar colunas necessárias
+    required_columns = ['Data', 'Valor']
+    if is_income:
+        required_columns.extend(['Tipo', 'Descrição'])
+    else:
+        required_columns.extend(['Origem', 'Categoria'])
+    
+    result = {'inserted': 0, 'duplicates': 0, 'errors': [], 'rows': 0, 'cancelled': False}
+    pending = deque()
+    seen = {}
+    
+    def collect(batch):
+        inserted, duplicates, insert_errors = collect_bulk_insert(batch)
+        result['inserted'] += inserted
+        result['duplicates'] += duplicates
+        result['errors'].extend(insert_errors)
+    
+    try:
+        for df, fraction in iter_spreadsheet_chunks(file, chunk_size):
+            if cancel_event is not None and cancel_event.is_set():
+                result['cancelled'] = True
+                break
+            
+            if result['rows'] == 0:
+                missing_columns = [col for col in required_columns if col not in df.columns]
+                if missing_columns:
+                    raise SpreadsheetFormatError(f"Colunas faltantes: {', '.join(missing_columns)}")
+            
+            # Validar o bloco de uma vez e enfileirar a gravação
+            records, chunk_errors = prepare_import_rows(df, user_id, is_income)
+            result['errors'].extend(chunk_errors)
+            # Bloco sem nenhuma linha válida: só os erros por linha são registrados
+            if not records.empty:
+                records['row_hash'] = fingerprint_records(records, is_income, seen)
+                pending.append(submit_bulk_insert(records, user_id, is_income, chunk_size))
+            
+            # Aguardar o escritor se a leitura estiver muito à frente
+            while len(pending) > IMPORT_MAX_PENDING:
+                collect(pending.popleft())
+            
+            result['rows'] += len(df)
+            if progress is not None:
+                progress(min(fraction, 1.0), result['rows'])
+    finally:
+        # Mesmo em caso de erro, os blocos enviados precisam ser confirmados
+        while pending:
+            collect(pending.popleft())
+    
+    return result
+
+# Função para importar dados de planilha
+def import_from_spreadsheet(file, user_id, is_income=False, progress=None, chunk_size=IMPORT_CHUNK_SIZE):
+    try:
+        result = run_import(file, user_id, is_income, progress, chunk_size)
+        return True, format_import_message(result['inserted'], result['errors'], result['duplicates'])
+    except SpreadsheetFormatError as e:
+        return False, str(e)
+    except Exception as e:
+        return False, f"Erro ao processar planilha: {str(e)}"
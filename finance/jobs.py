@@ -0,0 +1,111 @@
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from finance.db import execute_write, get_db, process_singleton, run_write
+from finance.importer import SpreadsheetFormatError, format_import_message, run_import
+
+# Importação em segundo plano: as importações rodam em um pool de threads do
+# processo e o andamento fica na tabela import_jobs, sobrevivendo aos reruns
+JOB_ACTIVE_STATUSES = ('pendente', 'executando')
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _insert_job(conn, user_id, file_name, is_income):
+    c = conn.execute('INSERT INTO import_jobs(user_id, file_name, is_income, status, pid, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                     (user_id, file_name, int(is_income), 'pendente', os.getpid(), datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    return c.lastrowid
+
+class ImportJobManager:
+    """Executa importações em threads de fundo, com progresso e cancelamento"""
+
+    def __init__(self, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="finance-import")
+        self._cancel_events = {}
+        self._lock = threading.Lock()
+        self._mark_orphaned_jobs()
+
+    def _mark_orphaned_jobs(self):
+        # Jobs de processos que já terminaram nunca serão concluídos. O gerenciador
+        # é criado antes de qualquer job deste processo, então um job com o nosso
+        # PID veio de um processo anterior que teve o PID reaproveitado
+        with get_db() as conn:
+            jobs = conn.execute(f"SELECT id, pid FROM import_jobs WHERE status IN {JOB_ACTIVE_STATUSES}").fetchall()
+        orphaned = [(job_id,) for job_id, pid in jobs if pid is None or pid == os.getpid() or not _process_alive(pid)]
+        if orphaned:
+            run_write(lambda conn: conn.executemany(
+                "UPDATE import_jobs SET status = 'interrompida', message = 'Servidor reiniciado durante a importação' WHERE id = ?",
+                orphaned))
+
+    def submit(self, file, user_id, is_income=False):
+        """Copia o arquivo enviado e agenda a importação; retorna o id do job"""
+        data = io.BytesIO(file.getvalue())
+        data.name = file.name
+        job_id = run_write(_insert_job, user_id, file.name, is_income)
+        with self._lock:
+            self._cancel_events[job_id] = threading.Event()
+        self._executor.submit(self._run, job_id, data, user_id, is_income)
+        return job_id
+
+    def cancel(self, job_id):
+        """Solicita o cancelamento; retorna False se o job não está em andamento neste processo"""
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+        if event is None:
+            return False
+        event.set()
+        return True
+
+    def _run(self, job_id, data, user_id, is_income):
+        with self._lock:
+            cancel_event = self._cancel_events[job_id]
+        started = time.perf_counter()
+        execute_write("UPDATE import_jobs SET status = 'executando', started_at = ? WHERE id = ?",
+                      (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), job_id))
+        
+        def progress(fraction, rows):
+            execute_write('UPDATE import_jobs SET progress = ?, rows_processed = ?, elapsed = ? WHERE id = ?',
+                          (fraction, rows, time.perf_counter() - started, job_id), wait=False)
+        
+        result = {'inserted': 0, 'duplicates': 0, 'errors': [], 'rows': 0}
+        try:
+            result = run_import(data, user_id, is_income, progress, cancel_event=cancel_event)
+            status = 'cancelada' if result['cancelled'] else 'concluída'
+            message = format_import_message(result['inserted'], result['errors'], result['duplicates'],
+                                            title="Importação cancelada" if result['cancelled'] else "Importação concluída")
+        except SpreadsheetFormatError as e:
+            status, message = 'erro', str(e)
+        except Exception as e:
+            status, message = 'erro', f"Erro ao processar planilha: {str(e)}"
+        finally:
+            with self._lock:
+                self._cancel_events.pop(job_id, None)
+        
+        execute_write('''UPDATE import_jobs SET status = ?, rows_processed = ?, inserted = ?, duplicates = ?, error_count = ?,
+                         message = ?, progress = CASE WHEN ? = 'concluída' THEN 1 ELSE progress END, finished_at = ?, elapsed = ?
+                         WHERE id = ?''',
+                      (status, result['rows'], result['inserted'], result['duplicates'], len(result['errors']), message,
+                       status, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), time.perf_counter() - started, job_id))
+
+@process_singleton
+def get_import_jobs():
+    """Gerenciador de importações único por processo"""
+    return ImportJobManager()
+
+def get_user_import_jobs(user_id, limit=10):
+    """Últimos jobs de importação do usuário (mais recentes primeiro)"""
+    with get_db() as conn:
+        c = conn.execute('''SELECT id, file_name, is_income, status, progress, rows_processed, inserted, duplicates,
+                                   error_count, elapsed, message, created_at
+                            FROM import_jobs WHERE user_id = ? ORDER BY id DESC LIMIT ?''', (user_id, limit))
+        return c.fetchall()
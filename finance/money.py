@@ -0,0 +1,27 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+import pandas as pd
+
+# Valores monetários: gravados e agregados como centavos inteiros (value_cents);
+# a conversão para reais acontece só na apresentação
+def to_cents(value):
+    """Converte um valor em reais para centavos inteiros (meio centavo arredonda para cima)"""
+    return int((Decimal(str(value)) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+def series_to_cents(values):
+    """Converte uma coluna em reais para centavos (Int64), com a mesma regra de to_cents; valores não numéricos ou infinitos viram <NA>"""
+    reais = pd.Series(pd.to_numeric(values, errors='coerce'), dtype='float64')
+    reais = reais.where(np.isfinite(reais))
+    scaled = reais * 100
+    cents = np.round(scaled)
+    # Só os valores a um fio de meio centavo dependem da regra de arredondamento
+    # (1000.005 * 100 dá 100000.4999... em float): esses passam pelo Decimal
+    near_half = (np.abs(scaled - np.trunc(scaled)) - 0.5).abs() <= np.maximum(1e-6, scaled.abs() * 1e-12)
+    if near_half.any():
+        cents[near_half] = reais[near_half].map(to_cents)
+    return cents.astype('Int64')
+
+def from_cents(cents):
+    """Centavos (escalar ou coluna) para reais, para exibição e gráficos"""
+    return cents / 100
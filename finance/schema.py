@@ -0,0 +1,207 @@
+from datetime import datetime
+
+from finance.db import get_db, run_write
+from finance.money import to_cents
+from finance.summary import create_monthly_summary, rebuild_monthly_summary
+
+# Migrações de esquema: cada migração roda uma única vez e sua versão fica
+# registrada na tabela schema_version
+def _table_columns(conn, table):
+    return [column[1] for column in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+
+def _migration_base_tables(conn):
+    """Cria as tabelas base"""
+    # Tabela de usuários (se não existir)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS userstable (
+            username TEXT PRIMARY KEY, 
+            password TEXT,
+            nome_completo TEXT,
+            cpf_cnpj TEXT,
+            tipo_pessoa TEXT,
+            data_cadastro TEXT
+        )
+    ''')
+    
+    # Tabela de despesas
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            origin TEXT,
+            value REAL,
+            category TEXT,
+            user_id TEXT,
+            cpf_cnpj TEXT,
+            tipo_pessoa TEXT
+        )
+    ''')
+    
+    # Tabela de receitas
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS incomes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT,
+            type TEXT,
+            description TEXT,
+            value REAL,
+            user_id TEXT,
+            cpf_cnpj TEXT,
+            tipo_pessoa TEXT
+        )
+    ''')
+
+def _migration_document_columns(conn):
+    """Adiciona colunas que faltam em bancos criados por versões antigas"""
+    expected = {
+        'userstable': ['nome_completo', 'cpf_cnpj', 'tipo_pessoa', 'data_cadastro'],
+        'expenses': ['cpf_cnpj', 'tipo_pessoa'],
+        'incomes': ['cpf_cnpj', 'tipo_pessoa'],
+    }
+    for table, columns in expected.items():
+        existing = _table_columns(conn, table)
+        for column in columns:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+
+def _migration_indexes(conn):
+    """Índices para as consultas por usuário, período, categoria/tipo e documento"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses(user_id, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_category ON expenses(user_id, category, value)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_incomes_user_date ON incomes(user_id, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_incomes_user_type ON incomes(user_id, type, value)")
+    
+    # Índices parciais e de cobertura para get_all_cpf_cnpj
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_userstable_cpf_cnpj ON userstable(cpf_cnpj, nome_completo)
+                    WHERE cpf_cnpj IS NOT NULL AND cpf_cnpj != ''""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_expenses_cpf_cnpj ON expenses(cpf_cnpj, origin)
+                    WHERE cpf_cnpj IS NOT NULL AND cpf_cnpj != ''""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_incomes_cpf_cnpj ON incomes(cpf_cnpj, description)
+                    WHERE cpf_cnpj IS NOT NULL AND cpf_cnpj != ''""")
+
+def _migration_row_hash(conn):
+    """Impressão digital das linhas importadas, para importação idempotente"""
+    for table in ('expenses', 'incomes'):
+        if 'row_hash' not in _table_columns(conn, table):
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN row_hash TEXT")
+        # Lançamentos manuais ficam com row_hash NULL, que não conflita no índice único
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_row_hash ON {table}(row_hash)")
+
+def _migration_import_jobs(conn):
+    """Tabela com o andamento das importações em segundo plano"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS import_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT,
+            file_name TEXT,
+            is_income INTEGER,
+            status TEXT,
+            progress REAL DEFAULT 0,
+            rows_processed INTEGER DEFAULT 0,
+            inserted INTEGER DEFAULT 0,
+            duplicates INTEGER DEFAULT 0,
+            error_count INTEGER DEFAULT 0,
+            message TEXT,
+            pid INTEGER,
+            created_at TEXT,
+            started_at TEXT,
+            finished_at TEXT,
+            elapsed REAL
+        )
+    ''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_import_jobs_user ON import_jobs(user_id, id)")
+
+def _migration_monthly_summary(conn):
+    """Sem efeito: o resumo mensal é criado (já em centavos) pela migração 7"""
+
+# Valores em centavos inteiros: o tipo da coluna só muda recriando a tabela
+CENTS_TABLES = {
+    'expenses': ['date', 'origin', 'value_cents', 'category', 'user_id', 'cpf_cnpj', 'tipo_pessoa', 'row_hash'],
+    'incomes': ['date', 'type', 'description', 'value_cents', 'user_id', 'cpf_cnpj', 'tipo_pessoa', 'row_hash'],
+}
+
+def _migration_integer_cents(conn):
+    """Converte value REAL em value_cents INTEGER e recria o resumo mensal em centavos"""
+    # O resumo e seus triggers são recriados em centavos no fim da migração
+    for table in CENTS_TABLES:
+        for event in ('insert', 'delete', 'update'):
+            conn.execute(f"DROP TRIGGER IF EXISTS trg_{table}_summary_{event}")
+    conn.execute("DROP TABLE IF EXISTS monthly_summary")
+    # Valores numéricos passam pelo mesmo arredondamento dos formulários e da
+    # importação (to_cents); o ROUND do SQLite sobre value * 100 em float daria
+    # 100000 para 1000.005, e não 100001
+    conn.create_function("to_cents", 1, to_cents, deterministic=True)
+    cents = "CASE WHEN typeof(value) IN ('integer', 'real') THEN to_cents(value) ELSE CAST(ROUND(value * 100) AS INTEGER) END"
+    for table, columns in CENTS_TABLES.items():
+        definitions = ", ".join(f"{column} INTEGER" if column == 'value_cents' else f"{column} TEXT" for column in columns)
+        sources = ", ".join(cents if column == 'value_cents' else column for column in columns)
+        conn.execute(f"CREATE TABLE {table}_cents (id INTEGER PRIMARY KEY AUTOINCREMENT, {definitions})")
+        conn.execute(f"INSERT INTO {table}_cents(id, {', '.join(columns)}) SELECT id, {sources} FROM {table}")
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_cents RENAME TO {table}")
+    
+    # Índices das migrações 3 e 4, agora sobre value_cents
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses(user_id, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_expenses_user_category ON expenses(user_id, category, value_cents)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_incomes_user_date ON incomes(user_id, date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_incomes_user_type ON incomes(user_id, type, value_cents)")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_expenses_cpf_cnpj ON expenses(cpf_cnpj, origin)
+                    WHERE cpf_cnpj IS NOT NULL AND cpf_cnpj != ''""")
+    conn.execute("""CREATE INDEX IF NOT EXISTS idx_incomes_cpf_cnpj ON incomes(cpf_cnpj, description)
+                    WHERE cpf_cnpj IS NOT NULL AND cpf_cnpj != ''""")
+    for table in CENTS_TABLES:
+        conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_row_hash ON {table}(row_hash)")
+    
+    create_monthly_summary(conn)
+    rebuild_monthly_summary(conn)
+
+def _migration_data_versions(conn):
+    """Versão dos dados por usuário, lida pelo cache de consultas (ver finance.db.read_data_version)"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            user_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    ''')
+
+MIGRATIONS = [
+    (1, "Tabelas base", _migration_base_tables),
+    (2, "Colunas de nome e CPF/CNPJ", _migration_document_columns),
+    (3, "Índices por usuário, data, categoria/tipo e CPF/CNPJ", _migration_indexes),
+    (4, "Hash de conteúdo das linhas importadas", _migration_row_hash),
+    (5, "Tabela de importações em segundo plano", _migration_import_jobs),
+    (6, "Resumo mensal (criado pela migração 7)", _migration_monthly_summary),
+    (7, "Valores em centavos inteiros", _migration_integer_cents),
+    (8, "Versão dos dados por usuário para o cache de consultas", _migration_data_versions),
+]
+
+def get_schema_version():
+    """Retorna a versão atual do esquema registrada no banco"""
+    with get_db() as conn:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT,
+                applied_at TEXT
+            )
+        ''')
+        return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+def _apply_migration(conn, version, description, migrate):
+    # BEGIN IMMEDIATE trava o banco para escrita: se outro processo aplicou
+    # a mesma migração nesse meio tempo, ela é ignorada
+    conn.execute('BEGIN IMMEDIATE')
+    if conn.execute('SELECT 1 FROM schema_version WHERE version = ?', (version,)).fetchone():
+        return False
+    migrate(conn)
+    conn.execute('INSERT INTO schema_version(version, description, applied_at) VALUES (?, ?, ?)',
+                 (version, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    return True
+
+def run_migrations():
+    """Aplica as migrações pendentes e retorna a versão final do esquema"""
+    current = get_schema_version()
+    for version, description, migrate in MIGRATIONS:
+        if version > current:
+            run_write(_apply_migration, version, description, migrate)
+    return get_schema_version()
@@ -0,0 +1,133 @@
+from datetime import date, timedelta
+
+import pandas as pd
+
+from finance.dates import parse_date_input
+from finance.db import bump_data_version, get_db, get_query_cache, run_write
+
+# Resumo mensal materializado: somas e contagens por (usuário, mês, tipo de
+# lançamento, categoria/tipo), mantidas por triggers na mesma transação de cada
+# INSERT/UPDATE/DELETE em expenses e incomes (formulários, importação e exclusões).
+# Lançamentos sem categoria/tipo ficam agrupados sob ''.
+SUMMARY_SOURCES = {
+    'expense': ('expenses', 'category'),
+    'income': ('incomes', 'type'),
+}
+
+def _summary_key(row, kind, column):
+    return (f"COALESCE({row}.user_id, '')", f"COALESCE(substr({row}.date, 1, 7), '')", f"'{kind}'",
+            f"COALESCE({row}.{column}, '')")
+
+def _add_to_summary(kind, column):
+    user_id, year_month, kind_value, category = _summary_key('NEW', kind, column)
+    return f"""
+        INSERT INTO monthly_summary(user_id, year_month, kind, category, total_cents, count)
+        VALUES ({user_id}, {year_month}, {kind_value}, {category}, COALESCE(NEW.value_cents, 0), 1)
+        ON CONFLICT(user_id, year_month, kind, category)
+        DO UPDATE SET total_cents = total_cents + excluded.total_cents, count = count + 1;"""
+
+def _remove_from_summary(kind, column):
+    user_id, year_month, kind_value, category = _summary_key('OLD', kind, column)
+    where = f"user_id = {user_id} AND year_month = {year_month} AND kind = {kind_value} AND category = {category}"
+    return f"""
+        UPDATE monthly_summary SET total_cents = total_cents - COALESCE(OLD.value_cents, 0), count = count - 1 WHERE {where};
+        DELETE FROM monthly_summary WHERE {where} AND count <= 0;"""
+
+def create_monthly_summary(conn):
+    """Cria a tabela monthly_summary e os triggers que a mantêm"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS monthly_summary (
+            user_id TEXT NOT NULL,
+            year_month TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            category TEXT NOT NULL,
+            total_cents INTEGER NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, kind, year_month, category)
+        ) WITHOUT ROWID
+    ''')
+    for kind, (table, column) in SUMMARY_SOURCES.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_summary_insert AFTER INSERT ON {table} BEGIN"
+                     f"{_add_to_summary(kind, column)}\n        END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_summary_delete AFTER DELETE ON {table} BEGIN"
+                     f"{_remove_from_summary(kind, column)}\n        END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS trg_{table}_summary_update AFTER UPDATE OF user_id, date, value_cents, {column} ON {table} BEGIN"
+                     f"{_remove_from_summary(kind, column)}{_add_to_summary(kind, column)}\n        END")
+
+def rebuild_monthly_summary(conn):
+    """Recalcula o resumo inteiro a partir dos lançamentos"""
+    conn.execute("DELETE FROM monthly_summary")
+    for kind, (table, column) in SUMMARY_SOURCES.items():
+        conn.execute(f'''
+            INSERT INTO monthly_summary(user_id, year_month, kind, category, total_cents, count)
+            SELECT COALESCE(user_id, ''), COALESCE(substr(date, 1, 7), ''), ?, COALESCE({column}, ''),
+                   COALESCE(SUM(value_cents), 0), COUNT(*)
+            FROM {table}
+            GROUP BY 1, 2, 4
+        ''', (kind,))
+    return conn.execute("SELECT COUNT(*) FROM monthly_summary").fetchone()[0]
+
+def _rebuild_and_bump(conn):
+    rows = rebuild_monthly_summary(conn)
+    # Invalida o cache de todos os usuários, inclusive em outros processos
+    bump_data_version(conn)
+    return rows
+
+def rebuild_summary():
+    """Reconstrói o resumo pela fila do escritor; retorna o número de linhas do resumo"""
+    rows = run_write(_rebuild_and_bump)
+    get_query_cache().clear()
+    return rows
+
+def split_period(start_date, end_date):
+    """Divide o período em meses inteiros [first_full, after_full) e as pontas parciais"""
+    start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    first_full = start if start.day == 1 else (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+    after_end = end + timedelta(days=1)
+    after_full = after_end if after_end.day == 1 else end.replace(day=1)
+    if first_full >= after_full:
+        return None, [(start_date, end_date)]
+
+    partial = []
+    if start < first_full:
+        partial.append((start_date, (first_full - timedelta(days=1)).isoformat()))
+    if after_full <= end:
+        partial.append((after_full.isoformat(), end_date))
+    return (first_full.isoformat()[:7], after_full.isoformat()[:7]), partial
+
+def get_category_totals(user_id, kind, start_date=None, end_date=None):
+    """Total (em centavos) e quantidade por categoria (despesas) ou tipo (receitas), do resumo mensal.
+
+    Meses inteiros do período vêm do resumo; só os dias das pontas parciais são
+    somados a partir dos lançamentos (no máximo dois meses, pelo índice user_id/date)."""
+    table, column = SUMMARY_SOURCES[kind]
+    queries = []
+    if start_date is None:
+        queries.append(("SELECT category, total_cents, count FROM monthly_summary WHERE user_id = ? AND kind = ?",
+                        (user_id, kind)))
+    else:
+        months, partial = split_period(parse_date_input(start_date), parse_date_input(end_date))
+        if months is not None:
+            queries.append(("""SELECT category, total_cents, count FROM monthly_summary
+                               WHERE user_id = ? AND kind = ? AND year_month >= ? AND year_month < ?""",
+                            (user_id, kind) + months))
+        for range_start, range_end in partial:
+            queries.append((f"""SELECT COALESCE({column}, ''), SUM(value_cents), COUNT(*) FROM {table}
+                                WHERE user_id = ? AND date BETWEEN ? AND ? GROUP BY 1""",
+                            (user_id, range_start, range_end)))
+
+    with get_db() as conn:
+        rows = [row for sql, params in queries for row in conn.execute(sql, params)]
+    totals = pd.DataFrame(rows, columns=['category', 'total_cents', 'count'])
+    totals = totals.groupby('category', as_index=False)[['total_cents', 'count']].sum()
+    return totals[totals['count'] > 0].reset_index(drop=True)
+
+def get_category_totals_cached(user_id, kind, start_date=None, end_date=None):
+    """Versão em cache de get_category_totals"""
+    key = ('summary', kind, parse_date_input(start_date), parse_date_input(end_date))
+    return get_query_cache().get_or_load(user_id, key, lambda: get_category_totals(user_id, kind, start_date, end_date))
+
+def get_summary_totals(user_id, start_date=None, end_date=None):
+    """Retorna (total de receitas, total de despesas) do usuário em centavos, todas ou do período"""
+    return (int(get_category_totals_cached(user_id, 'income', start_date, end_date)['total_cents'].sum()),
+            int(get_category_totals_cached(user_id, 'expense', start_date, end_date)['total_cents'].sum()))
@@ -0,0 +1,225 @@
+import pandas as pd
+
+from finance.dates import parse_date_input
+from finance.db import execute_write, get_db, get_query_cache, run_write
+
+# Funções para gerenciar dados
+EXPENSE_INSERT_SQL = 'INSERT INTO expenses(date, origin, value_cents, category, user_id, cpf_cnpj, tipo_pessoa) VALUES (?,?,?,?,?,?,?)'
+INCOME_INSERT_SQL = 'INSERT INTO incomes(date, type, description, value_cents, user_id, cpf_cnpj, tipo_pessoa) VALUES (?,?,?,?,?,?,?)'
+
+# Importação: linhas cujo hash já existe são ignoradas pelo índice único
+EXPENSE_IMPORT_SQL = 'INSERT OR IGNORE INTO expenses(date, origin, value_cents, category, user_id, cpf_cnpj, tipo_pessoa, row_hash) VALUES (?,?,?,?,?,?,?,?)'
+INCOME_IMPORT_SQL = 'INSERT OR IGNORE INTO incomes(date, type, description, value_cents, user_id, cpf_cnpj, tipo_pessoa, row_hash) VALUES (?,?,?,?,?,?,?,?)'
+
+def add_expense(date, origin, value_cents, category, user_id, cpf_cnpj=None, tipo_pessoa=None, wait=True):
+    return execute_write(EXPENSE_INSERT_SQL, 
+                         (date, origin, value_cents, category, user_id, cpf_cnpj, tipo_pessoa), wait=wait, invalidate=user_id)
+
+def get_expenses(user_id):
+    with get_db() as conn:
+        c = conn.execute('SELECT * FROM expenses WHERE user_id = ? ORDER BY date, id', (user_id,))
+        return c.fetchall()
+
+def delete_expense(id, user_id):
+    execute_write('DELETE FROM expenses WHERE id = ? AND user_id = ?', (id, user_id), invalidate=user_id)
+
+def add_income(date, type, description, value_cents, user_id, cpf_cnpj=None, tipo_pessoa=None, wait=True):
+    return execute_write(INCOME_INSERT_SQL, 
+                         (date, type, description, value_cents, user_id, cpf_cnpj, tipo_pessoa), wait=wait, invalidate=user_id)
+
+def get_incomes(user_id):
+    with get_db() as conn:
+        c = conn.execute('SELECT * FROM incomes WHERE user_id = ? ORDER BY date, id', (user_id,))
+        return c.fetchall()
+
+def delete_income(id, user_id):
+    execute_write('DELETE FROM incomes WHERE id = ? AND user_id = ?', (id, user_id), invalidate=user_id)
+
+# Exclusão em lote: um DELETE parametrizado por bloco de até DELETE_BATCH_SIZE ids,
+# todos na mesma transação do escritor. As linhas removidas (com id e row_hash)
+# são devolvidas para que a exclusão possa ser desfeita.
+DELETE_BATCH_SIZE = 500
+DELETE_COLUMNS = {
+    'expenses': ['id', 'date', 'origin', 'value_cents', 'category', 'user_id', 'cpf_cnpj', 'tipo_pessoa', 'row_hash'],
+    'incomes': ['id', 'date', 'type', 'description', 'value_cents', 'user_id', 'cpf_cnpj', 'tipo_pessoa', 'row_hash'],
+}
+
+def _delete_many(conn, table, ids, user_id):
+    columns = DELETE_COLUMNS[table]
+    deleted = []
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        batch = ids[start:start + DELETE_BATCH_SIZE]
+        where = f"user_id = ? AND id IN ({', '.join('?' * len(batch))})"
+        deleted += conn.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE {where}", [user_id, *batch]).fetchall()
+        conn.execute(f"DELETE FROM {table} WHERE {where}", [user_id, *batch])
+    return deleted
+
+def _restore_many(conn, table, rows):
+    columns = DELETE_COLUMNS[table]
+    sql = f"INSERT OR IGNORE INTO {table}({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    return conn.executemany(sql, rows).rowcount
+
+def delete_expenses(ids, user_id):
+    """Exclui as despesas do usuário com os ids informados em uma única transação; retorna as linhas excluídas"""
+    return run_write(_delete_many, 'expenses', [int(id) for id in ids], user_id, invalidate=user_id)
+
+def delete_incomes(ids, user_id):
+    """Exclui as receitas do usuário com os ids informados em uma única transação; retorna as linhas excluídas"""
+    return run_write(_delete_many, 'incomes', [int(id) for id in ids], user_id, invalidate=user_id)
+
+def restore_expenses(rows, user_id):
+    """Desfaz delete_expenses regravando as linhas devolvidas (mesmos ids); retorna quantas voltaram"""
+    return run_write(_restore_many, 'expenses', rows, invalidate=user_id)
+
+def restore_incomes(rows, user_id):
+    """Desfaz delete_incomes regravando as linhas devolvidas (mesmos ids); retorna quantas voltaram"""
+    return run_write(_restore_many, 'incomes', rows, invalidate=user_id)
+
+def get_totals(user_id):
+    """Retorna (total de receitas, total de despesas) do usuário em centavos, a partir do resumo mensal"""
+    with get_db() as conn:
+        totals = dict(conn.execute('SELECT kind, SUM(total_cents) FROM monthly_summary WHERE user_id = ? GROUP BY kind', (user_id,)))
+        return totals.get('income', 0), totals.get('expense', 0)
+
+# Leituras servidas pelo cache de consultas (DataFrames compartilhados: não modificar)
+EXPENSE_COLUMNS = ['id', 'date', 'origin', 'value_cents', 'category', 'user_id', 'cpf_cnpj', 'tipo_pessoa']
+INCOME_COLUMNS = ['id', 'date', 'type', 'description', 'value_cents', 'user_id', 'cpf_cnpj', 'tipo_pessoa']
+
+def read_frame(table, columns, user_id, start_date=None, end_date=None, order="date, id", limit=None):
+    """Lê os lançamentos do usuário (todo o histórico ou o período) direto do banco, sem cache"""
+    sql = f"SELECT {', '.join(columns)} FROM {table} WHERE user_id = ?"
+    params = [user_id]
+    if start_date is not None:
+        sql += " AND date BETWEEN ? AND ?"
+        params += [start_date, end_date]
+    sql += f" ORDER BY {order}"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    with get_db() as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+def _cached_frame(table, columns, user_id, start_date=None, end_date=None):
+    cache = get_query_cache()
+    if start_date is None:
+        return cache.get_or_load(user_id, (table,), lambda: read_frame(table, columns, user_id))
+    
+    start_date, end_date = parse_date_input(start_date), parse_date_input(end_date)
+    
+    # Se o histórico completo já está em cache, recorta o período sem ir ao banco
+    full = cache.peek(user_id, (table,))
+    if full is not None:
+        dates = full['date'].fillna('')
+        lo, hi = dates.searchsorted(start_date, side='left'), dates.searchsorted(end_date, side='right')
+        return full.iloc[lo:hi]
+    
+    return cache.get_or_load(user_id, (table, start_date, end_date),
+                             lambda: read_frame(table, columns, user_id, start_date, end_date))
+
+def get_expenses_df(user_id, start_date=None, end_date=None):
+    """Despesas do usuário (todas ou do período) como DataFrame em cache"""
+    return _cached_frame('expenses', EXPENSE_COLUMNS, user_id, start_date, end_date)
+
+def get_incomes_df(user_id, start_date=None, end_date=None):
+    """Receitas do usuário (todas ou do período) como DataFrame em cache"""
+    return _cached_frame('incomes', INCOME_COLUMNS, user_id, start_date, end_date)
+
+def get_recent_expenses_df(user_id, limit=10):
+    """Últimas despesas do usuário, em cache"""
+    return get_query_cache().get_or_load(user_id, ('expenses', 'recent', limit),
+                                         lambda: read_frame('expenses', EXPENSE_COLUMNS, user_id, order="date DESC, id DESC", limit=limit))
+
+def get_recent_incomes_df(user_id, limit=10):
+    """Últimas receitas do usuário, em cache"""
+    return get_query_cache().get_or_load(user_id, ('incomes', 'recent', limit),
+                                         lambda: read_frame('incomes', INCOME_COLUMNS, user_id, order="date DESC, id DESC", limit=limit))
+
+# Paginação por chave (keyset) em (date, id): cada página é uma busca no índice
+# (user_id, date) a partir da última linha da página anterior, sem OFFSET. O custo
+# depende só do tamanho da página, e exclusões não deslocam as páginas seguintes.
+def _read_page(table, columns, user_id, start_date, end_date, after=None, page_size=50):
+    sql = f"SELECT {', '.join(columns)} FROM {table} WHERE user_id = ? AND date BETWEEN ? AND ?"
+    params = [user_id, start_date, end_date]
+    if after is not None:
+        sql += " AND (date, id) > (?, ?)"
+        params += list(after)
+    # Uma linha a mais só para saber se existe próxima página
+    sql += " ORDER BY date, id LIMIT ?"
+    params.append(page_size + 1)
+    with get_db() as conn:
+        page = pd.read_sql_query(sql, conn, params=params)
+    
+    next_cursor = None
+    if len(page) > page_size:
+        page = page.iloc[:page_size]
+        next_cursor = (page['date'].iloc[-1], int(page['id'].iloc[-1]))
+    return page, next_cursor
+
+def _cached_page(table, columns, user_id, start_date, end_date, after=None, page_size=50):
+    start_date, end_date = parse_date_input(start_date), parse_date_input(end_date)
+    key = (table, 'page', start_date, end_date, after, page_size)
+    return get_query_cache().get_or_load(user_id, key,
+                                         lambda: _read_page(table, columns, user_id, start_date, end_date, after, page_size))
+
+def get_expenses_page(user_id, start_date, end_date, after=None, page_size=50):
+    """Página de despesas do período após o cursor (date, id); retorna (DataFrame, cursor da próxima página ou None)"""
+    return _cached_page('expenses', EXPENSE_COLUMNS, user_id, start_date, end_date, after, page_size)
+
+def get_incomes_page(user_id, start_date, end_date, after=None, page_size=50):
+    """Página de receitas do período após o cursor (date, id); retorna (DataFrame, cursor da próxima página ou None)"""
+    return _cached_page('incomes', INCOME_COLUMNS, user_id, start_date, end_date, after, page_size)
+
+def get_totals_cached(user_id):
+    """Versão em cache de get_totals"""
+    return get_query_cache().get_or_load(user_id, ('totals',), lambda: get_totals(user_id))
+
+def frame_rows(df):
+    """Converte um DataFrame de transações de volta para a lista de tuplas do banco"""
+    return list(df.itertuples(index=False, name=None))
+
+# Função para buscar CPF/CNPJ cadastrados
+def get_all_cpf_cnpj():
+    """Retorna todos os CPF/CNPJ cadastrados no sistema com nomes"""
+    users_data = []
+    expenses_data = []
+    incomes_data = []
+    
+    with get_db() as conn:
+        c = conn.cursor()
+        
+        try:
+            # Buscar CPF/CNPJ de usuários
+            c.execute("SELECT cpf_cnpj, nome_completo FROM userstable WHERE cpf_cnpj IS NOT NULL AND cpf_cnpj != ''")
+            users_data = c.fetchall()
+        except:
+            pass
+        
+        try:
+            # Buscar CPF/CNPJ de despesas
+            c.execute("SELECT cpf_cnpj, origin FROM expenses WHERE cpf_cnpj IS NOT NULL AND cpf_cnpj != ''")
+            expenses_data = c.fetchall()
+        except:
+            pass
+        
+        try:
+            # Buscar CPF/CNPJ de receitas
+            c.execute("SELECT cpf_cnpj, description FROM incomes WHERE cpf_cnpj IS NOT NULL AND cpf_cnpj != ''")
+            incomes_data = c.fetchall()
+        except:
+            pass
+    
+    # Combinar todos os dados
+    all_data = {}
+    for cpf_cnpj, nome in users_data:
+        if cpf_cnpj:
+            all_data[cpf_cnpj] = nome
+    
+    for cpf_cnpj, origem in expenses_data:
+        if cpf_cnpj:
+            all_data[cpf_cnpj] = origem
+    
+    for cpf_cnpj, descricao in incomes_data:
+        if cpf_cnpj:
+            all_data[cpf_cnpj] = descricao
+    
+    return all_data
@@ -0,0 +1,115 @@
+import hashlib
+import sqlite3
+from datetime import datetime
+
+from finance.db import execute_write, get_db, run_write
+
+# Funções de autenticação
+def make_hashes(password):
+    return hashlib.sha256(str.encode(password)).hexdigest()
+
+def check_hashes(password, hashed_text):
+    if make_hashes(password) == hashed_text:
+        return hashed_text
+    return False
+
+def create_user():
+    try:
+        with get_db() as conn:
+            c = conn.cursor()
+            # Verificar se usuário admin já existe
+            c.execute('SELECT * FROM userstable WHERE username = "admin"')
+            if not c.fetchone():
+                # Criar usuário admin padrão se não existir
+                c.execute('INSERT INTO userstable(username, password, nome_completo, data_cadastro) VALUES (?, ?, ?, ?)', 
+                         ('admin', make_hashes('1234'), 'Administrador', datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+    except Exception as e:
+        # Se houver erro, as tabelas serão criadas na próxima execução
+        print(f"Erro ao criar usuário admin: {e}")
+
+def add_user(username, password, nome_completo, cpf_cnpj, tipo_pessoa):
+    execute_write('INSERT INTO userstable(username, password, nome_completo, cpf_cnpj, tipo_pessoa, data_cadastro) VALUES (?,?,?,?,?,?)', 
+                  (username, password, nome_completo, cpf_cnpj, tipo_pessoa, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+def login_user(username, password):
+    with get_db() as conn:
+        c = conn.execute('SELECT * FROM userstable WHERE username =? AND password = ?', (username, password))
+        return c.fetchall()
+
+def get_user_info(username):
+    try:
+        with get_db() as conn:
+            c = conn.execute('SELECT nome_completo, cpf_cnpj, tipo_pessoa FROM userstable WHERE username = ?', (username,))
+            return c.fetchone()
+    except sqlite3.OperationalError as e:
+        # Se a tabela não existir, retorna None
+        return None
+
+def update_user_info(username, nome_completo, cpf_cnpj, tipo_pessoa):
+    execute_write('UPDATE userstable SET nome_completo = ?, cpf_cnpj = ?, tipo_pessoa = ? WHERE username = ?', 
+                  (nome_completo, cpf_cnpj, tipo_pessoa, username))
+
+def get_all_users():
+    with get_db() as conn:
+        c = conn.cursor()
+        
+        # Verificar se as colunas existem na tabela
+        try:
+            c.execute('PRAGMA table_info(userstable)')
+            columns = [column[1] for column in c.fetchall()]
+            
+            # Construir a query baseada nas colunas existentes
+            if 'cpf_cnpj' in columns and 'tipo_pessoa' in columns:
+                c.execute('SELECT username, nome_completo, cpf_cnpj, tipo_pessoa FROM userstable')
+            elif 'nome_completo' in columns:
+                c.execute('SELECT username, nome_completo FROM userstable')
+            else:
+                c.execute('SELECT username FROM userstable')
+                
+            users = c.fetchall()
+        except sqlite3.OperationalError:
+            users = []
+    
+    return users
+
+def delete_user(username):
+    execute_write('DELETE FROM userstable WHERE username = ?', (username,))
+
+# Funções para limpar dados
+def clear_user_data(username):
+    """Limpa todos os dados de um usuário específico"""
+    def _clear(conn):
+        # Limpar despesas do usuário
+        conn.execute('DELETE FROM expenses WHERE user_id = ?', (username,))
+        
+        # Limpar receitas do usuário
+        conn.execute('DELETE FROM incomes WHERE user_id = ?', (username,))
+    
+    try:
+        run_write(_clear, invalidate=username)
+        return True, "Dados limpos com sucesso!"
+    except Exception as e:
+        # O rollback é feito pela transação do escritor
+        return False, f"Erro ao limpar dados: {str(e)}"
+
+def delete_user_completely(username):
+    """Deleta um usuário e todos os seus dados (apenas para admin)"""
+    if username == "admin":
+        return False, "Não é possível deletar o usuário administrador."
+    
+    def _delete(conn):
+        # Limpar despesas do usuário
+        conn.execute('DELETE FROM expenses WHERE user_id = ?', (username,))
+        
+        # Limpar receitas do usuário
+        conn.execute('DELETE FROM incomes WHERE user_id = ?', (username,))
+        
+        # Deletar o usuário
+        conn.execute('DELETE FROM userstable WHERE username = ?', (username,))
+    
+    try:
+        # Transação única no escritor: commit ao final ou rollback em caso de erro
+        run_write(_delete, invalidate=username)
+        return True, f"Usuário {username} e todos os seus dados foram deletados com sucesso!"
+    except Exception as e:
+        return False, f"Erro ao deletar usuário: {str(e)}"
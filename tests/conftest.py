@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+# finance.db lê FINANCE_DB_PATH na importação: o banco de testes precisa ser
+# definido antes de qualquer import do pacote
+os.environ["FINANCE_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="finance-tests-"), "finance.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+@pytest.fixture(scope="session")
+def db():
+    """Banco de testes com todas as migrações aplicadas"""
+    from finance.bootstrap import initialize
+    return initialize()
+
+@pytest.fixture
+def user_id(db):
+    """Usuário novo a cada teste: os testes compartilham o banco, não os dados"""
+    return f"teste-{uuid.uuid4().hex[:8]}"
@@ -0,0 +1,80 @@
+import random
+import re
+
+import pandas as pd
+import pytest
+
+from finance.documents import (CNPJ_WEIGHTS, CPF_WEIGHTS, clean_document, normalize_documents, validate_cnpj,
+                               validate_cpf, validate_documents)
+
+# Validadores originais do app (um dígito por vez), usados como referência
+def legacy_validate_cpf(cpf):
+    cpf = re.sub(r'[^0-9]', '', cpf)
+    if len(cpf) != 11 or cpf == cpf[0] * 11:
+        return False
+    remainder = sum(int(cpf[i]) * (10 - i) for i in range(9)) % 11
+    digit1 = 0 if remainder < 2 else 11 - remainder
+    remainder = sum(int(cpf[i]) * (11 - i) for i in range(10)) % 11
+    digit2 = 0 if remainder < 2 else 11 - remainder
+    return int(cpf[9]) == digit1 and int(cpf[10]) == digit2
+
+def legacy_validate_cnpj(cnpj):
+    cnpj = re.sub(r'[^0-9]', '', cnpj)
+    if len(cnpj) != 14 or cnpj == cnpj[0] * 14:
+        return False
+    weights1 = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+    digit1 = 11 - (sum(int(cnpj[i]) * weights1[i] for i in range(12)) % 11)
+    if digit1 >= 10:
+        digit1 = 0
+    weights2 = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]
+    digit2 = 11 - (sum(int(cnpj[i]) * weights2[i] for i in range(13)) % 11)
+    if digit2 >= 10:
+        digit2 = 0
+    return int(cnpj[12]) == digit1 and int(cnpj[13]) == digit2
+
+def _with_check_digits(base, weights):
+    digits = list(base)
+    for weight in weights:
+        remainder = sum(digit * w for digit, w in zip(digits, weight)) % 11
+        digits.append(0 if remainder < 2 else 11 - remainder)
+    return ''.join(map(str, digits))
+
+def _samples():
+    rng = random.Random(42)
+    samples = ['', 'abc', '11111111111', '00000000000000', '529.982.247-25', '11.222.333/0001-81']
+    for length, weights in ((11, CPF_WEIGHTS), (14, CNPJ_WEIGHTS)):
+        for _ in range(500):
+            valid = _with_check_digits([rng.randint(0, 9) for _ in range(length - 2)], weights)
+            wrong = valid[:-1] + str((int(valid[-1]) + rng.randint(1, 9)) % 10)
+            samples += [valid, wrong, f"{valid[:3]}.{valid[3:6]}-{valid[6:]}", valid[:-1]]
+    # Texto qualquer com dígitos e pontuação
+    samples += [''.join(rng.choice('0123456789./- ') for _ in range(rng.randint(0, 18))) for _ in range(2000)]
+    return samples
+
+SAMPLES = _samples()
+
+def test_scalar_validators_match_legacy():
+    assert [validate_cpf(value) for value in SAMPLES] == [legacy_validate_cpf(value) for value in SAMPLES]
+    assert [validate_cnpj(value) for value in SAMPLES] == [legacy_validate_cnpj(value) for value in SAMPLES]
+
+def test_batch_validation_matches_legacy():
+    result = validate_documents(pd.Series(SAMPLES))
+    cpf = result['valido'] & (result['tipo_pessoa'] == 'Física')
+    cnpj = result['valido'] & (result['tipo_pessoa'] == 'Jurídica')
+    assert cpf.tolist() == [legacy_validate_cpf(value) for value in SAMPLES]
+    assert cnpj.tolist() == [legacy_validate_cnpj(value) for value in SAMPLES]
+
+@pytest.mark.parametrize('value, expected', [
+    ('529.982.247-25', '52998224725'),
+    (1234567890, '01234567890'),           # célula numérica perde o zero à esquerda do CPF
+    (1222333000181.0, '01222333000181'),   # e do CNPJ
+    ('', None),
+    (None, None),
+    (float('nan'), None),
+])
+def test_clean_document(value, expected):
+    assert clean_document(value) == expected
+
+def test_scalar_and_batch_normalization_agree():
+    values = SAMPLES[:200] + [None, float('nan'), 12345678909, 1234567890.0, 191, 11222333000181]
+    assert [clean_document(value) for value in values] == normalize_documents(values).tolist()
@@ -0,0 +1,74 @@
+import io
+
+from finance.importer import run_import
+from finance.transactions import get_expenses_df, get_incomes_df
+
+EXPENSES_CSV = """Data;Origem;Valor;Categoria;CPF
+02/01/2025;Mercado;10.10;Alimentação;529.982.247-25
+03/01/2025;Padaria;0.1;Alimentação;
+03/01/2025;Padaria;0.1;Alimentação;
+2025-02-04;Luz;199.95;Moradia;
+31/02/2025;Inválida;5;Outros;
+05/02/2025;Sem valor;abc;Outros;
+"""
+
+INCOMES_CSV = """Data;Tipo;Descrição;Valor
+05/01/2025;Dízimo;Membro;300
+05/01/2025;Dízimo;Membro;300
+06/01/2025;Oferta;Visitante;25.5
+"""
+
+def _file(text, name):
+    data = io.BytesIO(text.encode('utf-8'))
+    data.name = name
+    return data
+
+def test_reimport_skips_every_row_already_imported(user_id):
+    first = run_import(_file(EXPENSES_CSV, 'despesas.csv'), user_id)
+    assert (first['rows'], first['inserted'], first['duplicates'], len(first['errors'])) == (6, 4, 0, 2)
+
+    second = run_import(_file(EXPENSES_CSV, 'despesas.csv'), user_id)
+    assert (second['inserted'], second['duplicates'], len(second['errors'])) == (0, 4, 2)
+
+    expenses = get_expenses_df(user_id)
+    assert len(expenses) == 4
+    assert sorted(expenses['value_cents'].tolist()) == [10, 10, 1010, 19995]
+    assert expenses.loc[expenses['origin'] == 'Mercado', 'cpf_cnpj'].tolist() == ['52998224725']
+
+def test_identical_rows_are_counted_across_chunks(user_id):
+    # Com blocos de uma linha, as repetições do arquivo caem em blocos diferentes
+    first = run_import(_file(INCOMES_CSV, 'receitas.csv'), user_id, is_income=True, chunk_size=1)
+    assert (first['inserted'], first['duplicates']) == (3, 0)
+
+    second = run_import(_file(INCOMES_CSV, 'receitas.csv'), user_id, is_income=True, chunk_size=2)
+    assert (second['inserted'], second['duplicates']) == (0, 3)
+    assert len(get_incomes_df(user_id)) == 3
+
+def test_file_growing_only_imports_new_rows(user_id):
+    run_import(_file(INCOMES_CSV, 'receitas.csv'), user_id, is_income=True)
+    grown = INCOMES_CSV + "05/01/2025;Dízimo;Membro;300\n07/01/2025;Oferta;Visitante;10\n"
+    result = run_import(_file(grown, 'receitas.csv'), user_id, is_income=True)
+    assert (result['inserted'], result['duplicates']) == (2, 3)
+
+def test_same_file_for_another_user_is_not_a_duplicate(user_id):
+    run_import(_file(INCOMES_CSV, 'receitas.csv'), user_id, is_income=True)
+    result = run_import(_file(INCOMES_CSV, 'receitas.csv'), f"{user_id}-outro", is_income=True)
+    assert (result['inserted'], result['duplicates']) == (3, 0)
+
+def test_chunk_without_valid_rows_reports_row_errors(user_id):
+    text = "Data;Origem;Valor;Categoria\n2024-02-30;a;1;b\n05/02/2025;b;abc;c\n06/02/2025;c;2.5;d\n"
+    # Blocos de duas linhas: o primeiro não tem nenhuma linha válida
+    result = run_import(_file(text, 'despesas.csv'), user_id, chunk_size=2)
+    assert (result['rows'], result['inserted'], result['duplicates']) == (3, 1, 0)
+    assert [error.split(':')[0] for error in result['errors']] == ['Linha 2', 'Linha 3']
+
+def test_header_only_file_imports_nothing(user_id):
+    result = run_import(_file("Data;Origem;Valor;Categoria\n", 'despesas.csv'), user_id)
+    assert (result['rows'], result['inserted'], result['errors']) == (0, 0, [])
+
+def test_infinite_values_are_row_errors(user_id):
+    text = "Data;Origem;Valor;Categoria\n01/02/2025;a;inf;b\n02/02/2025;b;1e999;c\n03/02/2025;c;-inf;d\n04/02/2025;d;7;e\n"
+    result = run_import(_file(text, 'despesas.csv'), user_id)
+    assert (result['rows'], result['inserted']) == (4, 1)
+    assert [error.split(':')[0] for error in result['errors']] == ['Linha 2', 'Linha 3', 'Linha 4']
+    assert get_expenses_df(user_id)['value_cents'].tolist() == [700]
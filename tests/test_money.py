@@ -0,0 +1,37 @@
+import random
+
+import pandas as pd
+import pytest
+
+from finance.money import from_cents, series_to_cents, to_cents
+
+@pytest.mark.parametrize('value, cents', [
+    (1000.005, 100001),  # 1000.005 * 100 em float dá 100000.4999...
+    ('1000.005', 100001),
+    (0.125, 13),         # meio centavo exato em float
+    (2.675, 268),
+    (-1.005, -101),
+    (10.1, 1010),
+    (5, 500),
+])
+def test_to_cents_rounds_half_up(value, cents):
+    assert to_cents(value) == cents
+
+def test_series_to_cents_matches_to_cents():
+    rng = random.Random(3)
+    values = [round(rng.uniform(-1e6, 1e6), rng.randint(0, 4)) for _ in range(20000)]
+    values += [1000.005, 0.125, 2.675, -1.005, 0.005, 19.995]
+    assert series_to_cents(pd.Series(values)).tolist() == [to_cents(value) for value in values]
+    # Texto da planilha, como vem do CSV
+    text = pd.Series([str(value) for value in values])
+    assert series_to_cents(text).tolist() == [to_cents(value) for value in text]
+
+def test_series_to_cents_marks_invalid_values():
+    result = series_to_cents(pd.Series(['10,5', None, 'abc', '3.5', 'inf', '-inf', '1e999', float('inf')], dtype=object))
+    assert str(result.dtype) == 'Int64'
+    assert result.isna().tolist() == [True, True, True, False, True, True, True, True]
+    assert result.iloc[3] == 350
+
+def test_from_cents():
+    assert from_cents(100001) == 1000.01
+    assert from_cents(pd.Series([1, 250])).tolist() == [0.01, 2.5]
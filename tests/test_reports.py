@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from finance.cashflow import get_cash_flow
+from finance.db import run_write
+from finance.summary import get_category_totals, split_period
+
+CATEGORIES = ['Alimentação', 'Moradia', None]
+TYPES = ['Dízimo', 'Oferta']
+
+def _insert(conn, expenses, incomes):
+    conn.executemany('INSERT INTO expenses(date, origin, value_cents, category, user_id) VALUES (?, ?, ?, ?, ?)', expenses)
+    conn.executemany('INSERT INTO incomes(date, type, description, value_cents, user_id) VALUES (?, ?, ?, ?, ?)', incomes)
+
+@pytest.fixture
+def ledger(user_id):
+    """~600 lançamentos aleatórios entre 2022 e 2024; devolve os DataFrames de referência"""
+    rng = np.random.default_rng(7)
+    days = pd.date_range('2022-01-01', '2024-12-31').strftime('%Y-%m-%d')
+    expenses = pd.DataFrame({
+        'date': rng.choice(days, 400),
+        'origin': 'loja',
+        'value_cents': rng.integers(1, 500_000, 400),
+        'category': rng.choice(np.array(CATEGORIES, dtype=object), 400),
+        'user_id': user_id,
+    })
+    incomes = pd.DataFrame({
+        'date': rng.choice(days, 200),
+        'type': rng.choice(TYPES, 200),
+        'description': 'membro',
+        'value_cents': rng.integers(1, 800_000, 200),
+        'user_id': user_id,
+    })
+    rows = lambda df: [tuple(row) for row in df.astype(object).itertuples(index=False)]
+    run_write(_insert, rows(expenses), rows(incomes), invalidate=user_id)
+    return expenses, incomes
+
+def _reference_totals(df, column, start_date, end_date):
+    period = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
+    totals = period.assign(category=period[column].fillna('')).groupby('category')['value_cents'].agg(['sum', 'size'])
+    return {category: (int(total), int(count)) for category, (total, count) in totals.iterrows()}
+
+@pytest.mark.parametrize('start_date, end_date', [
+    ('2022-01-01', '2024-12-31'),  # só meses inteiros
+    ('2022-03-15', '2023-08-10'),  # pontas parciais nos dois lados
+    ('2023-05-02', '2023-05-30'),  # dentro de um único mês
+])
+def test_category_totals_match_pandas(ledger, user_id, start_date, end_date):
+    expenses, incomes = ledger
+    for kind, df, column in (('expense', expenses, 'category'), ('income', incomes, 'type')):
+        totals = get_category_totals(user_id, kind, start_date, end_date)
+        result = {row.category: (int(row.total_cents), int(row.count)) for row in totals.itertuples()}
+        assert result == _reference_totals(df, column, start_date, end_date)
+
+def test_category_totals_without_period_cover_history(ledger, user_id):
+    expenses, _ = ledger
+    totals = get_category_totals(user_id, 'expense')
+    assert int(totals['total_cents'].sum()) == int(expenses['value_cents'].sum())
+    assert int(totals['count'].sum()) == len(expenses)
+
+def test_split_period():
+    assert split_period('2024-01-01', '2024-03-31') == (('2024-01', '2024-04'), [])
+    assert split_period('2024-01-15', '2024-03-10') == (('2024-02', '2024-03'),
+                                                        [('2024-01-15', '2024-01-31'), ('2024-03-01', '2024-03-10')])
+    assert split_period('2024-01-15', '2024-01-20') == (None, [('2024-01-15', '2024-01-20')])
+
+def _reference_flow(expenses, incomes, start_date, end_date, bucket):
+    flows = pd.concat([
+        pd.DataFrame({'date': incomes['date'], 'income_cents': incomes['value_cents'], 'expense_cents': 0}),
+        pd.DataFrame({'date': expenses['date'], 'income_cents': 0, 'expense_cents': expenses['value_cents']}),
+    ])
+    flows['net'] = flows['income_cents'] - flows['expense_cents']
+    opening = int(flows.loc[flows['date'] < start_date, 'net'].sum())
+    period = flows[(flows['date'] >= start_date) & (flows['date'] <= end_date)].copy()
+    dates = pd.to_datetime(period['date'])
+    period['period'] = {
+        'day': dates,
+        'week': dates - pd.to_timedelta(dates.dt.weekday, unit='D'),
+        'month': dates.dt.to_period('M').dt.to_timestamp(),
+    }[bucket]
+    series = period.groupby('period')[['income_cents', 'expense_cents', 'net']].sum().reset_index()
+    series['balance_cents'] = opening + series['net'].cumsum()
+    return series
+
+@pytest.mark.parametrize('granularity, start_date, end_date', [
+    ('day', '2023-02-10', '2023-04-20'),
+    ('week', '2022-06-15', '2023-06-15'),
+    ('month', '2022-03-15', '2024-11-20'),
+])
+def test_cash_flow_matches_pandas(ledger, user_id, granularity, start_date, end_date):
+    expenses, incomes = ledger
+    flow, used = get_cash_flow(user_id, start_date, end_date, granularity, max_points=10_000)
+    expected = _reference_flow(expenses, incomes, start_date, end_date, granularity)
+
+    assert used == granularity
+    assert flow['period'].tolist() == expected['period'].tolist()
+    for column in ('income_cents', 'expense_cents', 'balance_cents'):
+        assert flow[column].astype('int64').tolist() == expected[column].astype('int64').tolist()
+    assert flow['net_cents'].astype('int64').tolist() == expected['net'].astype('int64').tolist()
+
+def test_cash_flow_downsampling_keeps_totals_and_final_balance(ledger, user_id):
+    full, _ = get_cash_flow(user_id, '2022-01-01', '2024-12-31', 'day', max_points=10_000)
+    reduced, _ = get_cash_flow(user_id, '2022-01-01', '2024-12-31', 'day', max_points=50)
+
+    assert len(reduced) == 50
+    assert reduced['income_cents'].sum() == full['income_cents'].sum()
+    assert reduced['expense_cents'].sum() == full['expense_cents'].sum()
+    assert reduced['balance_cents'].iloc[-1] == full['balance_cents'].iloc[-1]
+    assert (reduced['min_balance_cents'] <= reduced['balance_cents']).all()
+    assert (reduced['max_balance_cents'] >= reduced['balance_cents']).all()
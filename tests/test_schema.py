@@ -0,0 +1,85 @@
+import sqlite3
+
+from finance.money import to_cents
+from finance.schema import MIGRATIONS
+
+# Esquema das primeiras versões do app (create_tables), antes das migrações
+BASELINE_SCHEMA = '''
+    CREATE TABLE userstable (username TEXT PRIMARY KEY, password TEXT, nome_completo TEXT,
+                             cpf_cnpj TEXT, tipo_pessoa TEXT, data_cadastro TEXT);
+    CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, origin TEXT, value REAL,
+                           category TEXT, user_id TEXT, cpf_cnpj TEXT, tipo_pessoa TEXT);
+    CREATE TABLE incomes (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT, type TEXT, description TEXT,
+                          value REAL, user_id TEXT, cpf_cnpj TEXT, tipo_pessoa TEXT);
+'''
+
+EXPENSES = [
+    ('2024-01-05', 'Mercado', 10.1, 'Alimentação', 'ana', '52998224725', 'Física'),
+    ('2024-01-20', 'Mercado', 0.1, 'Alimentação', 'ana', None, None),
+    ('2024-02-02', 'Luz', 250.5, None, 'ana', None, None),
+    ('2024-02-03', 'Aluguel', 1200.0, 'Moradia', 'bia', None, None),
+]
+INCOMES = [
+    ('2024-01-07', 'Dízimo', 'Membro', 300.0, 'ana', None, None),
+    ('2024-02-07', 'Oferta', 'Empresa', 0.3, 'ana', '11222333000181', 'Jurídica'),
+]
+
+def _migrate(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.executemany('INSERT INTO expenses(date, origin, value, category, user_id, cpf_cnpj, tipo_pessoa) VALUES (?, ?, ?, ?, ?, ?, ?)', EXPENSES)
+    conn.executemany('INSERT INTO incomes(date, type, description, value, user_id, cpf_cnpj, tipo_pessoa) VALUES (?, ?, ?, ?, ?, ?, ?)', INCOMES)
+    conn.commit()
+    for _, _, migrate in MIGRATIONS:
+        migrate(conn)
+    conn.commit()
+    return conn
+
+def test_integer_cents_migration_converts_baseline_values(tmp_path):
+    conn = _migrate(str(tmp_path / "baseline.db"))
+
+    columns = [column[1] for column in conn.execute("PRAGMA table_info(expenses)")]
+    assert 'value' not in columns and 'value_cents' in columns
+    assert conn.execute("SELECT value_cents FROM expenses ORDER BY id").fetchall() == [(1010,), (10,), (25050,), (120000,)]
+    assert conn.execute("SELECT value_cents FROM incomes ORDER BY id").fetchall() == [(30000,), (30,)]
+    assert conn.execute("SELECT typeof(value_cents) FROM expenses GROUP BY 1").fetchall() == [('integer',)]
+    # Os demais campos e os ids são preservados
+    assert conn.execute("SELECT id, origin, category, cpf_cnpj FROM expenses WHERE id = 1").fetchone() == \
+        (1, 'Mercado', 'Alimentação', '52998224725')
+
+def test_integer_cents_migration_rebuilds_summary_and_indexes(tmp_path):
+    conn = _migrate(str(tmp_path / "baseline.db"))
+
+    summary = conn.execute("""SELECT user_id, year_month, kind, category, total_cents, count
+                              FROM monthly_summary ORDER BY user_id, kind, year_month, category""").fetchall()
+    assert summary == [
+        ('ana', '2024-01', 'expense', 'Alimentação', 1020, 2),
+        ('ana', '2024-02', 'expense', '', 25050, 1),
+        ('ana', '2024-01', 'income', 'Dízimo', 30000, 1),
+        ('ana', '2024-02', 'income', 'Oferta', 30, 1),
+        ('bia', '2024-02', 'expense', 'Moradia', 120000, 1),
+    ]
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'idx_expenses_user_date', 'idx_expenses_user_category', 'idx_incomes_user_type',
+            'idx_expenses_row_hash', 'idx_incomes_row_hash'} <= indexes
+
+    # Os triggers recriados mantêm o resumo nas escritas seguintes
+    conn.execute("INSERT INTO expenses(date, origin, value_cents, category, user_id) VALUES ('2024-02-10', 'Aluguel', 5, 'Moradia', 'bia')")
+    conn.execute("DELETE FROM expenses WHERE id = 2")
+    assert conn.execute("""SELECT total_cents, count FROM monthly_summary
+                           WHERE user_id = 'bia' AND kind = 'expense' AND year_month = '2024-02'""").fetchone() == (120005, 2)
+    assert conn.execute("""SELECT total_cents, count FROM monthly_summary
+                           WHERE user_id = 'ana' AND kind = 'expense' AND year_month = '2024-01'""").fetchone() == (1010, 1)
+
+def test_integer_cents_migration_rounds_like_the_forms(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "half.db"))
+    conn.executescript(BASELINE_SCHEMA)
+    values = [1000.005, 19.995, 2.675, 0.125, -1.005, None]
+    conn.executemany("INSERT INTO expenses(date, value, user_id) VALUES ('2024-01-01', ?, 'ana')", [(value,) for value in values])
+    conn.commit()
+    for _, _, migrate in MIGRATIONS:
+        migrate(conn)
+
+    migrated = [row[0] for row in conn.execute("SELECT value_cents FROM expenses ORDER BY id")]
+    assert migrated == [to_cents(value) for value in values[:-1]] + [None]
+    assert migrated[:2] == [100001, 2000]